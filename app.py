@@ -5,6 +5,7 @@ import uuid
 import shutil
 import time
 import logging
+import threading
 from werkzeug.utils import secure_filename
 from flask_cors import CORS
 import sys
@@ -19,9 +20,12 @@ api_key = os.getenv("GEMINI_API_KEY")
 print(f"Loaded Gemini API key: {'Available' if api_key else 'Missing'}")
 
 # Import your components
-from mutation_engine import MutationEngine
-from test_generator import TestGenerator
-from test_executor import TestExecutor
+from mutation_engine import MutationEngine, apply_mutation
+from source_model import SourceModel
+from test_generator import TestGenerator, DEFAULT_CONCURRENCY, DEFAULT_REQUESTS_PER_SECOND
+from test_cache import TestCache, DEFAULT_MAX_ENTRIES
+from test_executor import TestExecutor, NOT_COVERED
+from kill_matrix import KillMatrix
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, 
@@ -38,6 +42,15 @@ CORS(app, resources={r"/api/*": {"origins": "*", "methods": ["GET", "POST", "OPT
 # Dictionary to store sessions and their results
 sessions = {}
 
+# Tests run in each test-custom session, so a minimized subset can be re-run
+session_tests = {}
+
+# Generated tests persist across runs and restarts, outside the temporary directory
+TEST_CACHE_DIR = os.getenv("TESTFORGE_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "testforge", "tests"))
+# Created on first use (see get_test_cache), so importing the app touches no directory
+generated_tests_cache = None
+generated_tests_cache_lock = threading.Lock()
+
 # Create a temporary directory for all files
 TEMP_DIR = tempfile.mkdtemp()
 logger.info(f"Created temporary directory: {TEMP_DIR}")
@@ -49,6 +62,165 @@ def cleanup():
     shutil.rmtree(TEMP_DIR, ignore_errors=True)
 atexit.register(cleanup)
 
+def get_test_cache():
+    """
+    Return the generated-tests cache, creating it (and its directory) on first use.
+    """
+    global generated_tests_cache
+    with generated_tests_cache_lock:
+        if generated_tests_cache is None:
+            generated_tests_cache = TestCache(TEST_CACHE_DIR,
+                                              int(os.getenv("TESTFORGE_CACHE_SIZE", DEFAULT_MAX_ENTRIES)))
+            logger.info(f"Caching generated tests in {TEST_CACHE_DIR}")
+        return generated_tests_cache
+
+def create_test_executor(session_dir, data):
+    """
+    Create a TestExecutor configured from the execution options of a request.
+    Options: {"use_schemata": false, "backend": "subprocess" | "fork", "workers": 1, "first_kill": false,
+             "coverage": false, "prioritize": false,
+             "calibration_runs": 3, "session": false, "reduce_mutants": false,
+             "dominators_from": ["<session_id>", ...],
+             "sampling": null | "uniform" | "stratified", "ci_width": 10.0, "confidence": 0.95, "sample_seed": null,
+             "group_size": 0, "split_stream": false}
+    dominators_from names earlier sessions whose kill matrices are used for
+    dominator-mutant reduction; only runs on the same code count (their tests may differ).
+    reduce_mutants, sampling, group_size > 1 and split_stream are mutually
+    exclusive, and split_stream cannot be combined with session; conflicting
+    options, an unknown sampling strategy, a confidence outside (0, 1) or a
+    non-positive ci_width raise ValueError.
+    """
+    previous_results = []
+    for previous_session in data.get("dominators_from", []):
+        results = sessions.get(previous_session, {})
+        previous_results.extend(results.get("results", [results]))
+
+    return TestExecutor(
+        session_dir,
+        use_schemata=bool(data.get("use_schemata", False)),
+        backend=data.get("backend", "subprocess"),
+        workers=int(data.get("workers", 1)),
+        first_kill=bool(data.get("first_kill", False)),
+        coverage=bool(data.get("coverage", False)),
+        prioritize=bool(data.get("prioritize", False)),
+        calibration_runs=int(data.get("calibration_runs", 3)),
+        session=bool(data.get("session", False)),
+        reduce_mutants=bool(data.get("reduce_mutants", False)),
+        previous_results=previous_results,
+        sampling=data.get("sampling"),
+        ci_width=float(data.get("ci_width", 10.0)),
+        confidence=float(data.get("confidence", 0.95)),
+        sample_seed=data.get("sample_seed"),
+        group_size=int(data.get("group_size", 0)),
+        split_stream=bool(data.get("split_stream", False)),
+    )
+
+def create_test_generator(data):
+    """
+    Create a TestGenerator configured from the generation options of a request.
+    Options: {"generation_concurrency": 4, "generation_rate": 1.0, "batch_prompts": false}
+    generation_rate is the sustained number of Gemini requests per second
+    (must be positive, otherwise ValueError is raised);
+    batch_prompts asks for the tests of all mutants of a function in one prompt
+    (see generate_mutation_tests). Which mutants get tests is decided by
+    run_survivor_loop.
+    """
+    return TestGenerator(
+        os.getenv("GEMINI_API_KEY"),
+        concurrency=int(data.get("generation_concurrency", DEFAULT_CONCURRENCY)),
+        requests_per_second=float(data.get("generation_rate", DEFAULT_REQUESTS_PER_SECOND)),
+        cache=get_test_cache(),
+    )
+
+def generate_mutation_tests(test_generator, source, mutations, batched=False, targets=None, attempt=0):
+    """
+    Generate one AI test per mutation, concurrently, as test dictionaries in mutation order.
+    With batched, the mutants of one function share a single prompt. targets
+    limits generation to those mutation indices; attempt counts the earlier
+    rounds whose tests did not detect them.
+    """
+    targets = list(range(len(mutations))) if targets is None else targets
+    test_codes = test_generator.generate_tests_batch(
+        source.text,
+        [
+            (apply_mutation(source, mutations[idx]),
+             mutations[idx].get("mutation_description", mutations[idx].get("description", f"Mutation {idx}")))
+            for idx in targets
+        ],
+        source,
+        functions=[mutations[idx].get("function") for idx in targets] if batched else None,
+        attempt=attempt
+    )
+    suffix = f" (round {attempt + 1})" if attempt else ""
+    return [
+        {"name": f"Generated Test {idx}{suffix}", "code": test_code, "source": "ai", "target_mutation": idx}
+        for idx, test_code in zip(targets, test_codes)
+    ]
+
+def run_survivor_loop(test_executor, test_generator, code_path, source, mutations, tests, data):
+    """
+    Run the existing tests, then generate AI tests only for the mutants that survive them.
+    Options: {"generation_rounds": 1, "target_score": 100.0, "batch_prompts": false}
+    Each round generates a test per surviving mutant and runs the new tests
+    against the survivors only; rounds stop when the detection rate reaches
+    target_score, nothing survives or generation_rounds is used up. Every
+    round's results are merged into those of the first run (see
+    TestExecutor.merge_results), so no test runs twice against a mutant.
+    The results get a "generation_rounds" summary; tests is extended with
+    the generated tests.
+    """
+    max_rounds = max(0, int(data.get("generation_rounds", 1)))
+    target_score = float(data.get("target_score", 100.0))
+    batched = bool(data.get("batch_prompts", False))
+
+    results = test_executor.run_tests(code_path, mutations, tests, source)
+    rounds = []
+    for attempt in range(max_rounds):
+        survivors = [
+            idx for idx, result in enumerate(results["mutation_results"])
+            if result["status"] in ("survived", NOT_COVERED)
+        ]
+        if not survivors or results["mutation_detection_rate"] >= target_score:
+            break
+        new_tests = generate_mutation_tests(test_generator, source, mutations, batched, survivors, attempt)
+        round_results = test_executor.run_tests(code_path, [mutations[idx] for idx in survivors], new_tests, source,
+                                                first_test_file=results["total_tests"])
+        test_executor.merge_results(results, round_results, survivors)
+        tests.extend(new_tests)
+        killed = sum(result["was_detected"] for result in round_results["mutation_results"])
+        rounds.append({"round": attempt + 1, "targeted": len(survivors), "generated": len(new_tests),
+                       "killed": killed, "score": results["mutation_detection_rate"]})
+        logger.info(f"Generation round {attempt + 1}: {killed} of {len(survivors)} survivors killed")
+
+    results["generation_rounds"] = rounds
+    return results
+
+def minimize_results(results, weighted=False, level="test"):
+    """
+    Compute a minimal subset of the tests of one run that kills the same mutants
+    (greedy set cover over the kill matrix, optionally weighted by test runtime).
+    level "case" minimizes over test cases when the run used session mode.
+    """
+    if level == "case" and "case_kill_matrix" in results:
+        matrix = KillMatrix.from_dict(results["case_kill_matrix"])
+        durations = {case["case_id"]: case["mean_duration"] for case in results.get("test_cases", [])}
+    else:
+        matrix = KillMatrix.from_dict(results["kill_matrix"])
+        durations = {test["test_id"]: test["mean_duration"] for test in results.get("test_details", [])}
+    
+    costs = [durations.get(test_id, 1.0) for test_id in matrix.test_ids] if weighted else None
+    selected = matrix.minimal_cover(costs)
+    all_durations = [durations.get(test_id, 0.0) for test_id in matrix.test_ids]
+    return {
+        "level": "case" if level == "case" and "case_kill_matrix" in results else "test",
+        "selected_tests": selected,
+        "original_count": matrix.shape[1],
+        "minimized_count": len(selected),
+        "killed_mutants": int(matrix.killed().sum()),
+        "runtime_original": sum(all_durations),
+        "runtime_minimized": sum(durations.get(test_id, 0.0) for test_id in selected),
+    }
+
 # Serve the frontend React app (including Spline)
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
@@ -84,6 +256,7 @@ def health_check():
         "dependencies": {
             "gemini_api_key": "available" if has_gemini_key else "missing"
         },
+        "test_cache": generated_tests_cache.stats() if generated_tests_cache is not None else None,
         "server_info": {
             "flask_version": flask.__version__,
             "python_version": f"{sys.version_info.major}.{sys.version_info.minor}.{sys.version_info.micro}",
@@ -101,6 +274,11 @@ def test_custom():
     Run mutation testing on custom Python code.
     Request JSON: {"code": "...", "custom_tests": "...", "generate_ai_tests": true}
     Optional: {"mutations": [...]} to provide custom mutations
+    Optional: {"reuse_tests_from": "<session_id>", "weighted": false} to run only the
+              minimized test suite of an earlier session on the same code
+              (400 if that session tested different code)
+    Optional: {"generation_rounds": 1, "target_score": 100.0}, see run_survivor_loop
+    Optional: execution options, see create_test_executor
     """
     if request.method == 'OPTIONS':
         response = jsonify({})
@@ -122,6 +300,9 @@ def test_custom():
         with open(code_path, "w", encoding="utf-8") as f:
             f.write(data["code"])
         
+        # Read and parse the source once for the whole pipeline
+        source = SourceModel.from_file(code_path)
+        
         logger.info(f"Processing session {session_id} - Code length: {len(data['code'])}")
         logger.info(f"Code path: {code_path}")
         
@@ -136,12 +317,12 @@ def test_custom():
             
             # Create a direct debug test to see if the mutation engine works
             logger.info("DEBUG: Direct test of the mutation engine:")
-            debug_mutations = mutation_engine._generate_mutations_custom(code_path)
+            debug_mutations = mutation_engine._generate_mutations_custom(code_path, source)
             logger.info(f"DEBUG: Direct mutation engine test generated {len(debug_mutations)} mutations")
             if debug_mutations:
                 logger.info(f"DEBUG: First mutation: {debug_mutations[0].get('mutation_description', 'Unknown')}")
             
-            mutations = mutation_engine.generate_mutations(code_path)
+            mutations = mutation_engine.generate_mutations(code_path, source)
             logger.info(f"Generated {len(mutations)} mutations for session {session_id}")
             
             # If no mutations were generated, use a fallback approach
@@ -154,28 +335,40 @@ def test_custom():
                 for i, mutation in enumerate(mutations[:3]):
                     logger.info(f"Mutation {i}: {mutation.get('mutation_description', 'Unknown')} - Line {mutation.get('line_number', 'Unknown')}")
 
-        test_generator = TestGenerator(os.getenv("GEMINI_API_KEY"))
-        test_executor = TestExecutor(session_dir)
+        try:
+            test_generator = create_test_generator(data)
+            test_executor = create_test_executor(session_dir, data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
         tests = []
-        if "custom_tests" in data and data["custom_tests"]:
+        reuse_session = data.get("reuse_tests_from")
+        if reuse_session:
+            if reuse_session not in session_tests:
+                return jsonify({"error": f"Session {reuse_session} not found"}), 404
+            # The suite was minimized against the mutants of that session's code
+            if sessions[reuse_session].get("source_hash") != source.content_hash:
+                return jsonify({"error": f"Session {reuse_session} tested different code"}), 400
+            minimized = minimize_results(sessions[reuse_session], bool(data.get("weighted", False)))
+            tests = [dict(session_tests[reuse_session][test_idx]) for test_idx in minimized["selected_tests"]]
+            logger.info(f"Reusing {len(tests)} of {minimized['original_count']} tests from session {reuse_session}")
+        elif "custom_tests" in data and data["custom_tests"]:
             tests.append({"name": "Custom Test", "code": data["custom_tests"], "source": "custom"})
 
-        generate_ai_tests = data.get("generate_ai_tests", True)
+        generate_ai_tests = data.get("generate_ai_tests", True) and not reuse_session
         if generate_ai_tests and mutations:
-            for idx, mutation in enumerate(mutations):
-                test_code = test_generator.generate_test(
-                    data["code"],
-                    mutation.get("mutated_full_code", data["code"]),
-                    mutation.get("description", f"Mutation {idx}")
-                )
-                tests.append({"name": f"Generated Test {idx}", "code": test_code, "source": "ai", "target_mutation": idx})
-
-        results = test_executor.run_tests(code_path, mutations, tests)
+            results = run_survivor_loop(test_executor, test_generator, code_path, source, mutations, tests, data)
+        else:
+            results = test_executor.run_tests(code_path, mutations, tests, source)
         results["session_id"] = session_id
         results["timestamp"] = time.time()
 
         sessions[session_id] = results
+        session_tests[session_id] = [
+            {"name": test["name"], "code": test["code"], "source": test.get("source"),
+             "target_mutation": test.get("target_mutation")}
+            for test in tests
+        ]
         return jsonify(results)
 
     except Exception as e:
@@ -187,6 +380,8 @@ def test_github():
     """
     Run mutation testing on a GitHub repository.
     Request JSON: {"repo_url": "...", "target_file": "...", "custom_tests": "...", "generate_ai_tests": true}
+    Optional: {"generation_rounds": 1, "target_score": 100.0}, see run_survivor_loop
+    Optional: execution options, see create_test_executor
     """
     if request.method == 'OPTIONS':
         response = jsonify({})
@@ -205,8 +400,11 @@ def test_github():
         os.makedirs(session_dir, exist_ok=True)
 
         mutation_engine = MutationEngine(session_dir)
-        test_generator = TestGenerator(os.getenv("GEMINI_API_KEY"))
-        test_executor = TestExecutor(session_dir)
+        try:
+            test_generator = create_test_generator(data)
+            test_executor = create_test_executor(session_dir, data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
         repo_dir = mutation_engine.clone_github_repo(data["repo_url"])
         logger.info(f"Cloned repository to {repo_dir} for session {session_id}")
@@ -221,10 +419,9 @@ def test_github():
         all_results = []
         for code_path in python_files[:5]:
             try:
-                with open(code_path, "r", encoding="utf-8") as f:
-                    code = f.read()
+                source = SourceModel.from_file(code_path)
 
-                mutations = mutation_engine.generate_mutations(code_path)
+                mutations = mutation_engine.generate_mutations(code_path, source)
                 logger.info(f"Generated {len(mutations)} mutations for file {code_path}")
 
                 tests = []
@@ -232,16 +429,11 @@ def test_github():
                     tests.append({"name": "Custom Test", "code": data["custom_tests"], "source": "custom"})
 
                 generate_ai_tests = data.get("generate_ai_tests", True)
-                if generate_ai_tests:
-                    for idx, mutation in enumerate(mutations):
-                        test_code = test_generator.generate_test(
-                            code,
-                            mutation.get("mutated_full_code", code),
-                            mutation.get("description", f"Mutation {idx}")
-                        )
-                        tests.append({"name": f"Generated Test {idx}", "code": test_code, "source": "ai", "target_mutation": idx})
-
-                file_results = test_executor.run_tests(code_path, mutations, tests)
+                if generate_ai_tests and mutations:
+                    file_results = run_survivor_loop(test_executor, test_generator, code_path, source,
+                                                     mutations, tests, data)
+                else:
+                    file_results = test_executor.run_tests(code_path, mutations, tests, source)
                 file_results["file_path"] = os.path.relpath(code_path, repo_dir)
                 all_results.append(file_results)
             except Exception as e:
@@ -309,6 +501,44 @@ def get_results(session_id):
         return jsonify({"error": f"Session {session_id} not found"}), 404
     return jsonify(sessions[session_id])
 
+@app.route('/api/minimize/<session_id>', methods=['GET', 'POST', 'OPTIONS'])
+def minimize_suite(session_id):
+    """
+    Compute a minimal subset of a session's tests that kills the same mutants.
+    Optional (JSON body or query string): {"weighted": false, "level": "test" | "case"}
+    weighted prefers cheap tests by their measured runtime; "case" minimizes
+    over test cases for sessions run in session mode.
+    """
+    if request.method == 'OPTIONS':
+        response = jsonify({})
+        response.headers['Access-Control-Allow-Origin'] = 'http://localhost:3004'
+        response.headers['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
+        response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization'
+        return response, 200
+
+    if session_id not in sessions:
+        return jsonify({"error": f"Session {session_id} not found"}), 404
+
+    options = request.get_json(silent=True) or request.args
+    weighted = str(options.get("weighted", False)).lower() in ("1", "true", "yes")
+    level = options.get("level", "test")
+
+    try:
+        results = sessions[session_id]
+        if "results" in results:
+            # GitHub session: minimize each file's suite
+            files = [
+                dict(minimize_results(file_results, weighted, level), file_path=file_results["file_path"])
+                for file_results in results["results"] if "kill_matrix" in file_results
+            ]
+            return jsonify({"session_id": session_id, "files": files})
+        if "kill_matrix" not in results:
+            return jsonify({"error": f"Session {session_id} has no kill matrix"}), 400
+        return jsonify(dict(minimize_results(results, weighted, level), session_id=session_id))
+    except Exception as e:
+        logger.exception(f"Error in minimize: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=True)
\ No newline at end of file
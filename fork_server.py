@@ -0,0 +1,284 @@
+import os
+import sys
+import json
+import time
+import runpy
+import select
+import signal
+import importlib
+import subprocess
+from typing import Dict, Any, Optional, Sequence
+
+import line_coverage
+import split_stream
+import test_session
+from mutant_loader import install_mutant, load_compiled
+
+# Modules imported once by the server so forked test processes start warm
+DEFAULT_PRELOAD = ("unittest", "pytest")
+
+
+class ForkServer:
+    """
+    A long-lived test runner that forks a child for every test run
+    
+    The server process imports the interpreter's test frameworks once; each
+    (mutant, test) job is then run in a forked copy of it and the outcome is
+    sent back over a pipe. This replaces Python startup and test framework
+    imports on every run with a single fork(). Only available where
+    os.fork() exists.
+    """
+    
+    def __init__(self, preload: Sequence[str] = DEFAULT_PRELOAD):
+        """
+        Initialize the fork server client
+        
+        Args:
+            preload: Modules for the server to import before forking
+        """
+        self.preload = list(preload)
+        self._process: Optional[subprocess.Popen] = None
+    
+    @staticmethod
+    def is_supported() -> bool:
+        """Check whether the platform can fork"""
+        return hasattr(os, "fork")
+    
+    def start(self) -> None:
+        """Start the server process if it is not running"""
+        if self._process is not None and self._process.poll() is None:
+            return
+        self._process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__)] + self.preload,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            bufsize=1,
+        )
+    
+    def run_test(self, test_file: str, code_dir: str,
+                 env_overrides: Optional[Dict[str, str]] = None, timeout: float = 5,
+                 cwd: Optional[str] = None, coverage: Optional[Dict[str, str]] = None,
+                 mutant: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """
+        Run a test file in a forked child
+        
+        Args:
+            test_file: Path to the test file
+            code_dir: Directory to put first on sys.path (where the code under test lives)
+            env_overrides: Extra environment variables for the test
+            timeout: Seconds before the child is killed
+            cwd: Working directory for the test (optional)
+            coverage: {"target": code file, "output": JSON file} to record the
+                lines of the code file the test executes (optional)
+            mutant: {"code_file": original file, "source": mutated source} to
+                serve the mutant from memory in place of the code file, or
+                {"code_file", "compiled": file} for compiled schemata that
+                the server loads once (optional)
+        
+        Returns:
+            Dictionary with "passed", "timed_out" and "duration"
+        """
+        job = json.dumps({
+            "test_file": test_file,
+            "code_dir": code_dir,
+            "env": env_overrides or {},
+            "timeout": timeout,
+            "cwd": cwd,
+            "coverage": coverage,
+            "mutant": mutant,
+        })
+        return self._submit(job)
+    
+    def run_session(self, config: Dict[str, Any], code_dir: str,
+                    env_overrides: Optional[Dict[str, str]] = None, timeout: float = 5,
+                    cwd: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Run a whole test session (see test_session.run_session) in a forked child
+        
+        Args:
+            config: Session settings
+            code_dir: Directory to put first on sys.path (where the code under test lives)
+            env_overrides: Extra environment variables for the session
+            timeout: Seconds before the child is killed
+            cwd: Working directory for the session (optional)
+        
+        Returns:
+            Dictionary with "passed", "timed_out" and "duration"
+        """
+        job = json.dumps({
+            "session": config,
+            "code_dir": code_dir,
+            "env": env_overrides or {},
+            "timeout": timeout,
+            "cwd": cwd,
+        })
+        return self._submit(job)
+    
+    def run_split(self, test_file: str, code_dir: str, split: Dict[str, Any],
+                  timeout: float = 5, cwd: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Run a test file split-stream (see split_stream.run_split) in a forked child
+        
+        Args:
+            test_file: Path to the test file
+            code_dir: Directory to put first on sys.path (where the code under test lives)
+            split: {"code_file", "source", "output", "timeout"}: split-stream
+                schemata to serve in place of the code file, outcome file and
+                timeout of each mutant process
+            timeout: Seconds before the child is killed
+            cwd: Working directory for the test (optional)
+        
+        Returns:
+            Dictionary with "passed", "timed_out" and "duration"
+        """
+        job = json.dumps({
+            "test_file": test_file,
+            "code_dir": code_dir,
+            "env": {},
+            "timeout": timeout,
+            "cwd": cwd,
+            "split": split,
+        })
+        return self._submit(job)
+    
+    def _submit(self, job: str) -> Dict[str, Any]:
+        """Send one job to the server and wait for its outcome"""
+        # Restart and retry once if the server died
+        for _ in range(2):
+            self.start()
+            try:
+                self._process.stdin.write(job + "\n")
+                self._process.stdin.flush()
+                response = self._process.stdout.readline()
+            except (BrokenPipeError, OSError):
+                response = ""
+            if response:
+                return json.loads(response)
+            self.close()
+        
+        raise RuntimeError("Fork server stopped responding")
+    
+    def close(self) -> None:
+        """Stop the server process"""
+        if self._process is None:
+            return
+        try:
+            self._process.stdin.close()
+            self._process.wait(timeout=5)
+        except Exception:
+            self._process.kill()
+        self._process = None
+    
+    def __enter__(self) -> "ForkServer":
+        self.start()
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def serve(preload: Sequence[str]) -> None:
+    """
+    Server loop: read one JSON job per line from stdin and answer on stdout
+    
+    Args:
+        preload: Modules to import before serving
+    """
+    # Keep the protocol channel private; anything else printed goes nowhere
+    protocol = os.fdopen(os.dup(1), "w", buffering=1)
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 1)
+    
+    for module_name in preload:
+        try:
+            importlib.import_module(module_name)
+        except ImportError:
+            pass
+    
+    while True:
+        line = sys.stdin.readline()
+        if not line:
+            break
+        job = json.loads(line)
+        # Load compiled schemata before forking, so children only select their mutant
+        mutant = job.get("mutant") or (job.get("session") or {}).get("mutant")
+        if mutant and mutant.get("compiled"):
+            load_compiled(mutant["compiled"])
+        protocol.write(json.dumps(_fork_job(job, devnull)) + "\n")
+
+
+def _fork_job(job: Dict[str, Any], devnull: int) -> Dict[str, Any]:
+    """Fork a child for one job and collect its outcome"""
+    read_fd, write_fd = os.pipe()
+    start = time.perf_counter()
+    pid = os.fork()
+    
+    if pid == 0:
+        os.close(read_fd)
+        passed = _run_in_child(job, devnull)
+        os.write(write_fd, b"1" if passed else b"0")
+        os._exit(0)
+    
+    os.close(write_fd)
+    ready, _, _ = select.select([read_fd], [], [], job["timeout"])
+    timed_out = not ready
+    if timed_out:
+        os.kill(pid, signal.SIGKILL)
+        outcome = b""
+    else:
+        outcome = os.read(read_fd, 1)
+    os.close(read_fd)
+    os.waitpid(pid, 0)
+    
+    return {
+        "passed": outcome == b"1",
+        "timed_out": timed_out,
+        "duration": time.perf_counter() - start,
+    }
+
+
+def _run_in_child(job: Dict[str, Any], devnull: int) -> bool:
+    """Run a test file as __main__, the way `python test_file` would, split-stream, or a whole test session"""
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 2)
+    os.environ.update(job["env"])
+    if job.get("cwd"):
+        os.chdir(job["cwd"])
+    
+    if job.get("session"):
+        sys.path.insert(0, job["code_dir"])
+        try:
+            return test_session.run_session(job["session"])
+        except BaseException:
+            return False
+    
+    test_file = job["test_file"]
+    sys.argv = [test_file]
+    sys.path[:0] = [os.path.dirname(os.path.abspath(test_file)), job["code_dir"]]
+    if job.get("split"):
+        split = job["split"]
+        try:
+            return split_stream.run_split(test_file, split["code_file"], split["source"],
+                                          split["output"], split["timeout"])
+        except BaseException:
+            return False
+    if job.get("mutant"):
+        install_mutant(job["mutant"])
+    
+    try:
+        if job.get("coverage"):
+            line_coverage.run_traced(test_file, job["coverage"]["target"], job["coverage"]["output"])
+        else:
+            runpy.run_path(test_file, run_name="__main__")
+    except SystemExit as e:
+        return e.code in (0, None)
+    except BaseException:
+        return False
+    return True
+
+
+if __name__ == "__main__":
+    # Do not let the repository directory shadow modules of the code under test
+    sys.path.pop(0)
+    serve(sys.argv[1:])
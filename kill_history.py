@@ -0,0 +1,99 @@
+import threading
+from typing import Dict, List, Any, Tuple, Optional, Iterable, Hashable
+
+# Weight of a past kill at the same line, in the same function and by the same operator
+LINE_WEIGHT = 4.0
+FUNCTION_WEIGHT = 2.0
+OPERATOR_WEIGHT = 1.0
+
+
+class KillHistory:
+    """
+    Remember which tests killed which kinds of mutants
+    
+    Kills are counted per test for the mutant's concrete operator change
+    (e.g. "Change > to <="), its function and its (function, line). The
+    history is used to run the likeliest killer first against each new
+    mutant; with first-kill mode that shortens the time to a verdict for
+    mutants that get killed. Tests are remembered by a key that names the
+    same test in every run (see mutant_subsumption.test_key), never by
+    their position in a suite. Safe to share between worker threads.
+    """
+    
+    def __init__(self):
+        """Initialize an empty history"""
+        self._kills: Dict[Tuple[str, Any], Dict[Hashable, int]] = {}
+        self._lock = threading.Lock()
+    
+    def record(self, mutation: Dict[str, Any], killing_tests: Iterable[Hashable]) -> None:
+        """
+        Record the tests that killed a mutant
+        
+        Args:
+            mutation: Mutation details
+            killing_tests: Keys of the tests that killed it
+        """
+        keys = self._keys(mutation)
+        with self._lock:
+            for test_idx in killing_tests:
+                for key, _ in keys:
+                    counts = self._kills.setdefault(key, {})
+                    counts[test_idx] = counts.get(test_idx, 0) + 1
+    
+    def score(self, mutation: Dict[str, Any], test: Hashable) -> float:
+        """
+        Weighted number of past kills of similar mutants by a test
+        
+        Args:
+            mutation: Mutation details
+            test: Key of the test
+        
+        Returns:
+            Kill score (0 when the test never killed a similar mutant)
+        """
+        with self._lock:
+            return sum(weight * self._kills.get(key, {}).get(test, 0) for key, weight in self._keys(mutation))
+    
+    def order(self, mutation: Dict[str, Any], test_indices: List[Any],
+              durations: Optional[Dict[Any, float]] = None,
+              test_keys: Optional[Dict[Any, Hashable]] = None) -> List[Any]:
+        """
+        Order tests so the likeliest and cheapest killers of a mutant run first
+        
+        Tests are ranked by kill score per second of runtime; tests without a
+        score keep their runtime order, fastest first.
+        
+        Args:
+            mutation: Mutation details
+            test_indices: Tests (or cases) of the current run to order
+            durations: Measured runtime of each test in seconds (optional)
+            test_keys: Key of each test the history knows it by (optional,
+                the test index itself otherwise)
+        
+        Returns:
+            The test indices in run order
+        """
+        durations = durations or {}
+        test_keys = test_keys or {}
+        
+        def rank(test_idx: Any) -> Tuple[float, float, Any]:
+            duration = max(durations.get(test_idx, 1.0), 1e-3)
+            return (-self.score(mutation, test_keys.get(test_idx, test_idx)) / duration, duration, test_idx)
+        
+        return sorted(test_indices, key=rank)
+    
+    def _keys(self, mutation: Dict[str, Any]) -> List[Tuple[Tuple[str, Any], float]]:
+        """History keys of a mutant with their weights"""
+        # The description names the concrete change (e.g. "Change > to <="), not just the node type
+        operator = mutation.get("mutation_description", mutation.get("description"))
+        function = mutation.get("function")
+        line = mutation.get("line_number", mutation.get("line"))
+        
+        keys = []
+        if line is not None:
+            keys.append((("line", (function, line)), LINE_WEIGHT))
+        if function:
+            keys.append((("function", function), FUNCTION_WEIGHT))
+        if operator:
+            keys.append((("operator", operator), OPERATOR_WEIGHT))
+        return keys
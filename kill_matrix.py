@@ -0,0 +1,218 @@
+import base64
+from typing import Dict, List, Any, Optional, Sequence
+
+import numpy as np
+
+
+class KillMatrix:
+    """
+    Boolean mutant x test matrix of which test killed which mutant
+    
+    Backed by a NumPy bool array (one byte per cell, 100k cells are about
+    100 KB) and serialized bit-packed, so the score, per-test kill counts,
+    per-line survival and test redundancy are computed with vectorized
+    operations instead of Python loops over lists.
+    """
+    
+    def __init__(self, mutant_count: int, test_count: int, test_ids: Optional[Sequence[Any]] = None):
+        """
+        Initialize an empty matrix
+        
+        Args:
+            mutant_count: Number of mutants (rows)
+            test_count: Number of tests (columns)
+            test_ids: Label of each test (defaults to its index)
+        """
+        self.kills = np.zeros((mutant_count, test_count), dtype=bool)
+        self.test_ids = list(test_ids) if test_ids is not None else list(range(test_count))
+        self._columns = {test_id: column for column, test_id in enumerate(self.test_ids)}
+    
+    @property
+    def shape(self):
+        return self.kills.shape
+    
+    def record(self, mutant_idx: int, killing_tests: Sequence[Any]) -> None:
+        """
+        Mark the tests that killed a mutant
+        
+        Args:
+            mutant_idx: Row of the mutant
+            killing_tests: Labels of the tests that killed it
+        """
+        if killing_tests:
+            self.kills[mutant_idx, [self._columns[test_id] for test_id in killing_tests]] = True
+    
+    def killed(self) -> np.ndarray:
+        """Bool vector of the mutants killed by at least one test"""
+        return self.kills.any(axis=1)
+    
+    def killed_by(self, test_id: Any) -> np.ndarray:
+        """Indices of the mutants a test killed"""
+        return np.flatnonzero(self.kills[:, self._columns[test_id]])
+    
+    def kills_per_test(self) -> np.ndarray:
+        """Number of mutants each test killed"""
+        return self.kills.sum(axis=0)
+    
+    def mutation_score(self, killable: Optional[np.ndarray] = None) -> float:
+        """
+        Percentage of mutants killed
+        
+        Args:
+            killable: Bool vector of the mutants that count (e.g. not
+                stillborn or equivalent); defaults to all mutants
+        
+        Returns:
+            Mutation score in percent (0 when no mutant counts)
+        """
+        killed = self.killed()
+        if killable is not None:
+            killed = killed[killable]
+        return float(killed.mean() * 100) if killed.size else 0.0
+    
+    def survival_by_line(self, line_numbers: Sequence[int],
+                         killable: Optional[np.ndarray] = None) -> Dict[int, Dict[str, int]]:
+        """
+        Count the mutants and the survivors on each source line
+        
+        Args:
+            line_numbers: Line of each mutant
+            killable: Bool vector of the mutants that count (defaults to all)
+        
+        Returns:
+            Line -> {"mutants", "survived"}
+        """
+        lines = np.asarray(line_numbers, dtype=np.int64)
+        survived = ~self.killed()
+        if killable is not None:
+            lines, survived = lines[killable], survived[killable]
+        if not lines.size:
+            return {}
+        
+        unique_lines, inverse = np.unique(lines, return_inverse=True)
+        mutants = np.bincount(inverse, minlength=unique_lines.size)
+        survivors = np.bincount(inverse, weights=survived, minlength=unique_lines.size).astype(np.int64)
+        return {
+            int(line): {"mutants": int(count), "survived": int(alive)}
+            for line, count, alive in zip(unique_lines, mutants, survivors)
+        }
+    
+    def duplicate_tests(self) -> List[List[Any]]:
+        """
+        Groups of tests that kill exactly the same (non-empty) set of mutants
+        
+        Returns:
+            Test labels of each group of two or more tests
+        """
+        effective = np.flatnonzero(self.kills_per_test() > 0)
+        if not effective.size:
+            return []
+        columns = np.packbits(self.kills[:, effective].T, axis=1)
+        _, inverse, counts = np.unique(columns, axis=0, return_inverse=True, return_counts=True)
+        inverse = inverse.reshape(-1)
+        return [
+            [self.test_ids[column] for column in effective[inverse == group]]
+            for group in np.flatnonzero(counts > 1)
+        ]
+    
+    def subsumed_tests(self) -> Dict[Any, List[Any]]:
+        """
+        Tests whose kills are a strict subset of another test's kills
+        
+        Returns:
+            Subsumed test label -> labels of the tests that subsume it
+        """
+        as_int = self.kills.astype(np.int32)
+        shared = as_int.T @ as_int
+        counts = np.diag(shared)
+        # a is subsumed by b when every kill of a is a kill of b and b kills more
+        subsumed = (shared == counts[:, None]) & (counts[None, :] > counts[:, None]) & (counts[:, None] > 0)
+        return {
+            self.test_ids[a]: [self.test_ids[b] for b in np.flatnonzero(subsumed[a])]
+            for a in np.flatnonzero(subsumed.any(axis=1))
+        }
+    
+    def minimal_cover(self, costs: Optional[Sequence[float]] = None) -> List[Any]:
+        """
+        Greedy set cover: a small subset of tests killing every killed mutant
+        
+        Each step picks the test that kills the most still-uncovered mutants
+        per unit of cost, until the subset kills everything the full suite
+        kills.
+        
+        Args:
+            costs: Cost of each test, e.g. its runtime (defaults to 1 per test)
+        
+        Returns:
+            Labels of the selected tests, in the order they were picked
+        """
+        mutant_count, test_count = self.shape
+        costs = np.ones(test_count) if costs is None else np.maximum(np.asarray(costs, dtype=float), 1e-9)
+        uncovered = self.killed()
+        as_int = self.kills.astype(np.int32)
+        
+        selected = []
+        while uncovered.any():
+            gains = uncovered.astype(np.int32) @ as_int
+            ratios = np.where(gains > 0, gains / costs, -1.0)
+            best = int(np.argmax(ratios))
+            selected.append(self.test_ids[best])
+            uncovered &= ~self.kills[:, best]
+        return selected
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Serialize the matrix (bit-packed, base64) for JSON results
+        
+        Returns:
+            Dictionary with "shape", "tests" and "packed"
+        """
+        return {
+            "shape": list(self.shape),
+            "tests": self.test_ids,
+            "packed": base64.b64encode(np.packbits(self.kills, axis=None).tobytes()).decode("ascii"),
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "KillMatrix":
+        """
+        Rebuild a matrix serialized with to_dict
+        
+        Args:
+            data: Serialized matrix
+        
+        Returns:
+            The KillMatrix
+        """
+        mutant_count, test_count = data["shape"]
+        matrix = cls(mutant_count, test_count, data.get("tests"))
+        bits = np.unpackbits(np.frombuffer(base64.b64decode(data["packed"]), dtype=np.uint8))
+        matrix.kills[:] = bits[:mutant_count * test_count].reshape(mutant_count, test_count).astype(bool)
+        return matrix
+    
+    def summary(self, line_numbers: Optional[Sequence[int]] = None,
+                killable: Optional[np.ndarray] = None) -> Dict[str, Any]:
+        """
+        Serialized matrix plus its redundancy analytics
+        
+        Args:
+            line_numbers: Line of each mutant, for per-line survival (optional)
+            killable: Bool vector of the mutants that count (defaults to all)
+        
+        Returns:
+            to_dict() with "kills_per_test", "duplicate_tests", "subsumed_tests"
+            and "survival_by_line" added
+        """
+        kills_per_test = self.kills_per_test()
+        summary = self.to_dict()
+        summary.update({
+            "kills_per_test": dict(zip(map(str, self.test_ids), kills_per_test.tolist())),
+            "ineffective_tests": [self.test_ids[column] for column in np.flatnonzero(kills_per_test == 0)],
+            "duplicate_tests": self.duplicate_tests(),
+            "subsumed_tests": {str(test): by for test, by in self.subsumed_tests().items()},
+        })
+        if line_numbers is not None:
+            summary["survival_by_line"] = {
+                str(line): counts for line, counts in self.survival_by_line(line_numbers, killable).items()
+            }
+        return summary
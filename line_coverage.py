@@ -0,0 +1,114 @@
+import os
+import sys
+import json
+import runpy
+import threading
+from typing import Dict, List, Set
+
+
+class LineCollector:
+    """
+    Record the lines of one target file executed while tracing is active
+    
+    Uses sys.settrace so it works without the coverage package; only frames
+    of the target file get a local trace function.
+    """
+    
+    def __init__(self, target_file: str):
+        """
+        Initialize the collector
+        
+        Args:
+            target_file: Path of the file whose lines are recorded
+        """
+        self.target = os.path.realpath(target_file)
+        self.lines: Set[int] = set()
+        self._is_target: Dict[str, bool] = {}
+    
+    def start(self) -> None:
+        threading.settrace(self._trace_call)
+        sys.settrace(self._trace_call)
+    
+    def stop(self) -> None:
+        sys.settrace(None)
+        threading.settrace(None)
+    
+    def _trace_call(self, frame, event, arg):
+        filename = frame.f_code.co_filename
+        is_target = self._is_target.get(filename)
+        if is_target is None:
+            is_target = self._is_target[filename] = os.path.realpath(filename) == self.target
+        if not is_target:
+            return None
+        self.lines.add(frame.f_lineno)
+        return self._trace_line
+    
+    def _trace_line(self, frame, event, arg):
+        if event == "line":
+            self.lines.add(frame.f_lineno)
+        return self._trace_line
+
+
+def run_traced(test_file: str, target_file: str, output_file: str) -> None:
+    """
+    Run a test file as __main__ and save the target lines it executed
+    
+    SystemExit raised by the test (e.g. unittest.main()) is propagated after
+    the covered lines are written, so the exit status is the test's own.
+    
+    Args:
+        test_file: Path to the test file
+        target_file: Path to the code under test
+        output_file: Where to write the covered lines as JSON
+    """
+    collector = LineCollector(target_file)
+    sys.argv = [test_file]
+    collector.start()
+    try:
+        runpy.run_path(test_file, run_name="__main__")
+    finally:
+        collector.stop()
+        with open(output_file, "w", encoding="utf-8") as f:
+            json.dump(sorted(collector.lines), f)
+
+
+def read_covered_lines(output_file: str) -> Set[int]:
+    """
+    Read the lines saved by run_traced
+    
+    Args:
+        output_file: File written by run_traced
+    
+    Returns:
+        Set of covered line numbers (empty if the file is missing or unreadable)
+    """
+    try:
+        with open(output_file, "r", encoding="utf-8") as f:
+            return set(json.load(f))
+    except (OSError, ValueError):
+        return set()
+
+
+def build_line_index(covered_lines: Dict[int, Set[int]]) -> Dict[int, List[int]]:
+    """
+    Invert per-test coverage into a line -> tests index
+    
+    Args:
+        covered_lines: Covered lines of each test, keyed by test index
+    
+    Returns:
+        Sorted test indices that execute each line
+    """
+    index: Dict[int, List[int]] = {}
+    for test_idx in sorted(covered_lines):
+        for line in covered_lines[test_idx]:
+            index.setdefault(line, []).append(test_idx)
+    return index
+
+
+if __name__ == "__main__":
+    # Usage: python line_coverage.py <target_file> <output_file> <test_file>
+    target, output, test = sys.argv[1:4]
+    # Behave like `python test_file`: the test's directory comes first on sys.path
+    sys.path[0] = os.path.dirname(os.path.abspath(test))
+    run_traced(test, target, output)
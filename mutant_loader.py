@@ -0,0 +1,176 @@
+import os
+import sys
+import runpy
+import marshal
+import importlib.abc
+import importlib.util
+from types import CodeType, ModuleType
+from typing import Dict, Any, Optional, Tuple
+
+from mutant_schemata import ACTIVE_MUTANT_GLOBAL, ACTIVE_MUTANT_ENV, NO_MUTANT
+
+# Code objects read by load_compiled, by file and modification time; a fork
+# server loads them before forking, so its children never read them again
+_compiled_code: Dict[Tuple[str, int], CodeType] = {}
+
+
+class MutantFinder(importlib.abc.MetaPathFinder, importlib.abc.Loader):
+    """
+    Import hook that serves a mutant from memory under the original module name
+    
+    Installed first on sys.meta_path, it answers the import of one module
+    name with the mutated source instead of the file on disk, so tests that
+    do ``from source import ...`` run the mutant without a mutated file ever
+    being written. The module keeps the original file as its origin, which
+    keeps tracebacks and line numbers pointing at the code under test.
+    Mutant-schemata modules find the active mutant (from the environment)
+    in a global defined before their code runs, so one compiled schemata
+    module serves every mutant it holds.
+    """
+    
+    def __init__(self, module_name: str, source: Optional[str], origin: str,
+                 namespace: Optional[Dict[str, Any]] = None, code: Optional[CodeType] = None):
+        """
+        Initialize the finder
+        
+        Args:
+            module_name: Name the code under test is imported as
+            source: Mutated source code (None when only its compiled code is given)
+            origin: Path of the original file
+            namespace: Globals to define in the module before its code runs (optional)
+            code: Compiled mutated source (optional, compiled on import otherwise)
+        """
+        self.module_name = module_name
+        self.source = source
+        self.origin = origin
+        self.namespace = namespace or {}
+        self.code = code
+    
+    def install(self) -> None:
+        """Put the finder first on sys.meta_path and forget any loaded original"""
+        sys.modules.pop(self.module_name, None)
+        sys.meta_path.insert(0, self)
+    
+    def uninstall(self) -> None:
+        """Remove the finder and the mutant module it served"""
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+        sys.modules.pop(self.module_name, None)
+    
+    def find_spec(self, fullname, path, target=None):
+        if fullname != self.module_name:
+            return None
+        return importlib.util.spec_from_loader(fullname, self, origin=self.origin)
+    
+    def create_module(self, spec) -> Optional[ModuleType]:
+        return None
+    
+    def exec_module(self, module: ModuleType) -> None:
+        module.__file__ = self.origin
+        module.__dict__[ACTIVE_MUTANT_GLOBAL] = int(os.environ.get(ACTIVE_MUTANT_ENV, NO_MUTANT))
+        module.__dict__.update(self.namespace)
+        code = self.code if self.code is not None else compile_mutant(self.source, self.origin)
+        exec(code, module.__dict__)
+    
+    def get_source(self, fullname: str) -> Optional[str]:
+        return self.source
+
+
+def module_name_of(code_file: str) -> str:
+    """
+    Name a code file is imported as
+    
+    Args:
+        code_file: Path to the code file
+    
+    Returns:
+        The module name (file name without .py)
+    """
+    return os.path.splitext(os.path.basename(code_file))[0]
+
+
+def compile_mutant(source: str, origin: str) -> CodeType:
+    """
+    Compile mutated source the way MutantFinder imports it
+    
+    Args:
+        source: Mutated source code
+        origin: Path of the original file
+    
+    Returns:
+        The module code object
+    """
+    return compile(source, origin, "exec", dont_inherit=True)
+
+
+def write_compiled(compiled_file: str, source: str, origin: str) -> None:
+    """
+    Compile mutated source once and save the code object for load_compiled
+    
+    Args:
+        compiled_file: File to write the marshalled code object to
+        source: Mutated source code
+        origin: Path of the original file
+    """
+    with open(compiled_file, "wb") as f:
+        marshal.dump(compile_mutant(source, origin), f)
+
+
+def load_compiled(compiled_file: str) -> CodeType:
+    """
+    Read a code object saved by write_compiled (once per process and file version)
+    
+    Args:
+        compiled_file: File written by write_compiled
+    
+    Returns:
+        The module code object
+    """
+    key = (compiled_file, os.stat(compiled_file).st_mtime_ns)
+    if key not in _compiled_code:
+        with open(compiled_file, "rb") as f:
+            _compiled_code[key] = marshal.load(f)
+    return _compiled_code[key]
+
+
+def install_mutant(mutant: Dict[str, str]) -> MutantFinder:
+    """
+    Serve a mutant in place of its code file
+    
+    Args:
+        mutant: {"code_file": original file} with the mutated "source" or a
+            "compiled" file written by write_compiled
+    
+    Returns:
+        The installed finder
+    """
+    code = load_compiled(mutant["compiled"]) if mutant.get("compiled") else None
+    finder = MutantFinder(module_name_of(mutant["code_file"]), mutant.get("source"), mutant["code_file"], code=code)
+    finder.install()
+    return finder
+
+
+def run_with_mutant(test_file: str, mutant: Dict[str, str]) -> None:
+    """
+    Run a test file as __main__ with a mutant served in place of a code file
+    
+    Args:
+        test_file: Path to the test file
+        mutant: Mutant to serve (see install_mutant)
+    """
+    install_mutant(mutant)
+    sys.argv = [test_file]
+    runpy.run_path(test_file, run_name="__main__")
+
+
+if __name__ == "__main__":
+    # Usage: python mutant_loader.py <code_file> <test_file> [<compiled_file>],
+    # mutated source on stdin unless a compiled file is given
+    code, test = sys.argv[1:3]
+    if len(sys.argv) > 3:
+        mutant = {"code_file": code, "compiled": sys.argv[3]}
+    else:
+        mutant = {"code_file": code, "source": sys.stdin.buffer.read().decode("utf-8")}
+    # Behave like `python test_file`: the test's directory comes first on sys.path
+    sys.path[0] = os.path.dirname(os.path.abspath(test))
+    run_with_mutant(test, mutant)
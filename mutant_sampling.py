@@ -0,0 +1,83 @@
+import math
+import random
+from statistics import NormalDist
+from typing import Dict, List, Any, Tuple, Optional
+
+# Sampling strategies
+UNIFORM = "uniform"
+STRATIFIED = "stratified"
+
+
+def wilson_interval(successes: int, trials: int, confidence: float = 0.95) -> Tuple[float, float]:
+    """
+    Wilson score interval of a proportion
+    
+    Unlike the normal approximation it stays inside [0, 1] and behaves
+    well for small samples and scores close to 0 or 100%.
+    
+    Args:
+        successes: Number of killed mutants
+        trials: Number of mutants that could be killed
+        confidence: Confidence level of the interval
+    
+    Returns:
+        (low, high) bounds of the proportion, (0, 1) when there are no trials
+    """
+    if trials <= 0:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    p = successes / trials
+    denominator = 1 + z * z / trials
+    center = (p + z * z / (2 * trials)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials)) / denominator
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+
+class MutantSampler:
+    """
+    Order mutants for sampling
+    
+    Uniform sampling shuffles all mutants. Stratified sampling groups them
+    by (function, operator) and interleaves the shuffled groups in
+    proportion to their size, so every prefix of the order is a
+    proportionally stratified sample.
+    """
+    
+    def __init__(self, mutations: List[Dict[str, Any]], strategy: str = UNIFORM, seed: Optional[int] = None):
+        """
+        Initialize the sampler
+        
+        Args:
+            mutations: Mutation details
+            strategy: UNIFORM or STRATIFIED
+            seed: Random seed, for reproducible samples (optional)
+        """
+        if strategy not in (UNIFORM, STRATIFIED):
+            raise ValueError(f"Unknown sampling strategy: {strategy}")
+        self.mutations = mutations
+        self.strategy = strategy
+        self.random = random.Random(seed)
+    
+    def order(self) -> List[int]:
+        """
+        Draw the order in which mutants are evaluated
+        
+        Returns:
+            Mutation indices, the first n of which form a sample of size n
+        """
+        indices = list(range(len(self.mutations)))
+        self.random.shuffle(indices)
+        if self.strategy == UNIFORM:
+            return indices
+        
+        strata: Dict[Tuple[Any, Any], List[int]] = {}
+        for idx in indices:
+            mutation = self.mutations[idx]
+            strata.setdefault((mutation.get("function"), mutation.get("mutation_operator")), []).append(idx)
+        
+        # The k-th of n mutants in a stratum is placed at (k + u) / n, u random in [0, 1)
+        positions = []
+        for members in strata.values():
+            offset = self.random.random()
+            positions.extend(((rank + offset) / len(members), idx) for rank, idx in enumerate(members))
+        return [idx for _, idx in sorted(positions)]
@@ -0,0 +1,216 @@
+import ast
+import bisect
+from typing import Dict, List, Any, Tuple, Optional
+
+from source_model import SourceModel
+
+# Module global (and environment variable) that selects the active mutant
+ACTIVE_MUTANT_GLOBAL = "__testforge_active_mutant__"
+ACTIVE_MUTANT_ENV = "TESTFORGE_ACTIVE_MUTANT"
+
+# No mutant is active: the schemata module behaves like the original code
+NO_MUTANT = -1
+
+# Module global of split-stream schemata: called with the mutant ids of a
+# site when it is reached, returns the id of the mutant to run there
+SPLIT_GLOBAL = "__testforge_split__"
+
+
+class SchemataCompiler:
+    """
+    Compile many mutants into one mutant-schemata module
+    
+    Every mutated expression is replaced by a conditional expression that
+    checks the active-mutant id, e.g. ``(a - b) if ACTIVE == 3 else (a + b)``,
+    and every mutated augmented assignment by an ``if``/``else`` on the same
+    id. The module is compiled once; switching mutants is done by setting the
+    environment variable before import or the module global at runtime. The
+    module is served by MutantFinder (see mutant_loader), which defines the
+    global before the module code runs, so no header is added and the guarded
+    expressions keep their line numbers.
+    
+    Split-stream schemata call a selector function with the ids of a site
+    instead of reading the global, so a test runner can fork one process
+    per mutant the first time the site is reached; the runner defines the
+    selector (see split_stream).
+    
+    Mutants that cannot be guarded this way (line-based mutations,
+    augmented assignments sharing a line with other statements, or any
+    mutant of source that does not parse) are left out and reported as
+    skipped so they can be executed on their own.
+    """
+    
+    def __init__(self, source: SourceModel):
+        """
+        Initialize the compiler
+        
+        Args:
+            source: Source model of the original code
+        """
+        self.source = source
+        self._expressions: Dict[Tuple[int, int], ast.AST] = {}
+        self._gaps: List[Tuple[int, int, ast.AST]] = []
+        
+        try:
+            tree = source.tree
+        except SyntaxError:
+            # Mutants of an original that does not compile cannot be guarded
+            tree = None
+        
+        self.enabled = tree is not None
+        for node in (ast.walk(tree) if tree is not None else ()):
+            if isinstance(node, ast.expr):
+                self._expressions[self._span(node)] = node
+            if isinstance(node, ast.BinOp):
+                self._add_gap(node.left, node.right, node)
+            elif isinstance(node, ast.AugAssign):
+                self._add_gap(node.target, node.value, node)
+            elif isinstance(node, ast.Compare):
+                operands = [node.left] + node.comparators
+                for left, right in zip(operands, operands[1:]):
+                    self._add_gap(left, right, node)
+            elif isinstance(node, ast.BoolOp):
+                for left, right in zip(node.values, node.values[1:]):
+                    self._add_gap(left, right, node)
+        
+        # Operator gaps never overlap, so they can be searched by start offset
+        self._gaps.sort(key=lambda gap: gap[0])
+        self._gap_starts = [gap[0] for gap in self._gaps]
+    
+    def compile(self, mutations: List[Dict[str, Any]], mutant_ids: Optional[List[int]] = None,
+                split: bool = False) -> Dict[str, Any]:
+        """
+        Build the schemata module for a list of mutations
+        
+        Args:
+            mutations: Mutation details
+            mutant_ids: Id to guard each mutation with (defaults to its index in the list)
+            split: Guard the sites with the split-stream selector (SPLIT_GLOBAL)
+        
+        Returns:
+            Dictionary with the module "code", the "mutant_ids" it contains and
+            the "skipped" ids that must be run on their own instead
+        """
+        if mutant_ids is None:
+            mutant_ids = list(range(len(mutations)))
+        
+        sites: Dict[Tuple[int, int], Dict[str, Any]] = {}
+        included, skipped = [], []
+        
+        for mutant_id, mutation in zip(mutant_ids, mutations):
+            site = self._locate(mutation)
+            if site is None:
+                skipped.append(mutant_id)
+                continue
+            
+            (start, end), is_statement = site
+            mutation_start = self.source.offset(mutation["line_number"], mutation["col_offset"])
+            mutation_end = self.source.offset(mutation["end_line_number"], mutation["end_col_offset"])
+            text = self.source.text
+            mutated_text = text[start:mutation_start] + mutation["replacement"] + text[mutation_end:end]
+            
+            sites.setdefault((start, end), {"start": start, "end": end, "statement": is_statement,
+                                            "split": split, "mutants": []})
+            sites[(start, end)]["mutants"].append((mutant_id, mutated_text))
+            included.append(mutant_id)
+        
+        ordered = sorted(sites.values(), key=lambda site: (site["start"], -site["end"]))
+        code, _ = self._render(0, len(self.source.text), ordered, 0)
+        
+        return {
+            "code": code,
+            "mutant_ids": included,
+            "skipped": skipped,
+        }
+    
+    def _locate(self, mutation: Dict[str, Any]) -> Optional[Tuple[Tuple[int, int], bool]]:
+        """
+        Find the node a mutation has to be guarded at
+        
+        Returns:
+            ((start offset, end offset), is_statement) or None if the mutation cannot be guarded
+        """
+        if not self.enabled or "replacement" not in mutation or "col_offset" not in mutation:
+            return None
+        if mutation.get("source_hash") and mutation["source_hash"] != self.source.content_hash:
+            raise ValueError(f"Mutation {mutation.get('mutation_id')} was generated from a different source")
+        
+        start = self.source.offset(mutation["line_number"], mutation["col_offset"])
+        end = self.source.offset(mutation["end_line_number"], mutation["end_col_offset"])
+        
+        # Node-level mutations (constants, return values) replace a whole expression
+        if (start, end) in self._expressions:
+            return (start, end), False
+        
+        # Operator mutations are guarded at the expression (or statement) that owns the operator
+        index = bisect.bisect_right(self._gap_starts, start) - 1
+        if index < 0 or not (self._gaps[index][0] <= start and end <= self._gaps[index][1]):
+            return None
+        node = self._gaps[index][2]
+        span = self._span(node)
+        if isinstance(node, ast.AugAssign):
+            if not self._stands_alone(node):
+                return None
+            return span, True
+        return span, False
+    
+    def _render(self, start: int, end: int, sites: List[Dict[str, Any]], index: int) -> Tuple[str, int]:
+        """Render text[start:end] with every guarded site inside it replaced"""
+        text = self.source.text
+        parts = []
+        position = start
+        while index < len(sites) and sites[index]["start"] < end:
+            site = sites[index]
+            parts.append(text[position:site["start"]])
+            original, index = self._render(site["start"], site["end"], sites, index + 1)
+            parts.append(self._guard(site, original))
+            position = site["end"]
+        parts.append(text[position:end])
+        return "".join(parts), index
+    
+    def _guard(self, site: Dict[str, Any], original: str) -> str:
+        """Wrap a site so each of its mutants runs only while active"""
+        if site["split"]:
+            selector = f"{SPLIT_GLOBAL}({tuple(mutant_id for mutant_id, _ in site['mutants'])!r})"
+        else:
+            selector = ACTIVE_MUTANT_GLOBAL
+        
+        if not site["statement"]:
+            branches = "".join(
+                f"({mutated}) if {selector} == {mutant_id} else "
+                for mutant_id, mutated in site["mutants"]
+            )
+            return f"({branches}({original}))"
+        
+        line = self.source.lines[self._line_of(site["start"]) - 1]
+        indent = line[:len(line) - len(line.lstrip())]
+        parts = []
+        for position, (mutant_id, mutated) in enumerate(site["mutants"]):
+            keyword = "if" if position == 0 else f"{indent}elif"
+            parts.append(f"{keyword} {selector} == {mutant_id}:\n{indent}    {mutated}\n")
+        parts.append(f"{indent}else:\n{indent}    {original}")
+        return "".join(parts)
+    
+    def _add_gap(self, left: ast.AST, right: ast.AST, node: ast.AST) -> None:
+        self._gaps.append((self._span(left)[1], self._span(right)[0], node))
+    
+    def _span(self, node: ast.AST) -> Tuple[int, int]:
+        """Character offsets of a node in the source text"""
+        source = self.source
+        return (
+            source.offset(node.lineno, source.char_col(node.lineno, node.col_offset)),
+            source.offset(node.end_lineno, source.char_col(node.end_lineno, node.end_col_offset)),
+        )
+    
+    def _line_of(self, offset: int) -> int:
+        """1-based line number of a character offset"""
+        return bisect.bisect_right(self.source.line_offsets, offset)
+    
+    def _stands_alone(self, node: ast.stmt) -> bool:
+        """Check that a statement is the only code on its lines"""
+        lines = self.source.lines
+        start_col = self.source.char_col(node.lineno, node.col_offset)
+        end_col = self.source.char_col(node.end_lineno, node.end_col_offset)
+        before = lines[node.lineno - 1][:start_col]
+        after = lines[node.end_lineno - 1][end_col:].strip()
+        return not before.strip() and (not after or after.startswith("#"))
@@ -0,0 +1,156 @@
+import hashlib
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+
+from kill_matrix import KillMatrix
+from source_model import SourceModel
+
+# Kill patterns compared at once in dynamic_dominators
+DOMINATOR_BLOCK = 512
+
+
+def mutant_key(mutation: Dict[str, Any]) -> str:
+    """
+    Identify a mutant across runs on the same code
+    
+    Patch-based mutants are keyed by the source hash, span and replacement;
+    line-based mutants by their line and description.
+    
+    Args:
+        mutation: Mutation details (or a mutation result carrying "mutant_key")
+    
+    Returns:
+        Key of the mutant
+    """
+    if "mutant_key" in mutation:
+        return mutation["mutant_key"]
+    if "replacement" in mutation and "col_offset" in mutation:
+        return (
+            f"{mutation.get('source_hash', '')[:16]}:{mutation['line_number']}:{mutation['col_offset']}-"
+            f"{mutation['end_line_number']}:{mutation['end_col_offset']}:{mutation['replacement']}"
+        )
+    description = mutation.get("mutation_description", mutation.get("description", ""))
+    return f"{mutation.get('line_number', mutation.get('line', 0))}:{description}"
+
+
+def test_key(test: Dict[str, Any]) -> str:
+    """
+    Identify a test across runs by its code
+    
+    Args:
+        test: Test dictionary (or a test detail carrying "test_key")
+    
+    Returns:
+        SHA-256 hex digest of the test code
+    """
+    if "test_key" in test:
+        return test["test_key"]
+    return hashlib.sha256(test.get("code", "").encode("utf-8")).hexdigest()
+
+
+def dynamic_dominators(matrix: KillMatrix) -> Dict[int, int]:
+    """
+    Find subsumed mutants from a kill matrix
+    
+    Mutant a subsumes mutant b when every test that kills a also kills b,
+    so a test killing a is known to kill b. The dominators are the killed
+    mutants no other mutant subsumes (the first of a group with the same
+    kills); every other killed mutant is mapped to one of them.
+    
+    Mutants are compared by their distinct kill patterns, a block of
+    patterns at a time, so memory stays at DOMINATOR_BLOCK x patterns
+    instead of mutants x mutants.
+    
+    Args:
+        matrix: Kill matrix of a previous run
+    
+    Returns:
+        Subsumed mutant row -> dominator row
+    """
+    killed_rows = np.flatnonzero(matrix.killed())
+    if not killed_rows.size:
+        return {}
+    
+    # Mutants with the same kills share a pattern; its first mutant leads it
+    patterns, first, inverse = np.unique(matrix.kills[killed_rows], axis=0, return_index=True, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    leaders = killed_rows[first]
+    # float32 products go through BLAS and are exact for counts below 2**24
+    as_float = patterns.astype(np.float32)
+    counts = as_float.sum(axis=1)
+    
+    # A pattern is dominated when another pattern is a strict subset of it
+    dominated = np.zeros(len(patterns), dtype=bool)
+    for start in range(0, len(patterns), DOMINATOR_BLOCK):
+        block = slice(start, start + DOMINATOR_BLOCK)
+        shared = as_float[block] @ as_float.T
+        dominated |= ((shared == counts[block, None]) & (counts[block, None] < counts[None, :])).any(axis=0)
+    
+    # Map every dominated pattern to the dominator pattern with the first leader among its subsets
+    dominator_patterns = np.flatnonzero(~dominated)
+    dominator_patterns = dominator_patterns[np.argsort(leaders[dominator_patterns])]
+    pattern_dominator = np.arange(len(patterns))
+    dominated_patterns = np.flatnonzero(dominated)
+    for start in range(0, len(dominated_patterns), DOMINATOR_BLOCK):
+        block = dominated_patterns[start:start + DOMINATOR_BLOCK]
+        shared = as_float[block] @ as_float[dominator_patterns].T
+        pattern_dominator[block] = dominator_patterns[(shared == counts[dominator_patterns][None, :]).argmax(axis=1)]
+    
+    dominator_of = {}
+    for position, row in enumerate(killed_rows):
+        dominator_row = leaders[pattern_dominator[inverse[position]]]
+        if dominator_row != row:
+            dominator_of[int(row)] = int(dominator_row)
+    return dominator_of
+
+
+class MutantReducer:
+    """
+    Decide which mutants must be executed and which can be inferred
+    
+    Dominator relations come from the kill matrices of previous runs on
+    the same code, matched to the current mutants by mutant key. The
+    previous runs may have used other tests (e.g. the custom tests plus
+    the tests generated for their survivors): subsumption is a property of
+    the mutants, so a relation seen with one suite is assumed to hold for
+    the next. A subsumed mutant is only executed when its dominator
+    survives; otherwise it inherits the dominator's kill.
+    """
+    
+    def __init__(self, source: SourceModel, mutations: List[Dict[str, Any]],
+                 previous_results: Optional[List[Dict[str, Any]]] = None):
+        """
+        Initialize the reducer
+        
+        Args:
+            source: Source model of the original code
+            mutations: Mutation details of the current run
+            previous_results: Results of earlier run_tests calls (with "kill_matrix")
+        """
+        dominator_of = {}
+        current = {mutant_key(mutation): idx for idx, mutation in enumerate(mutations)}
+        for results in previous_results or []:
+            # Kills of another version of the code say nothing about these mutants
+            if "kill_matrix" not in results or results.get("source_hash") != source.content_hash:
+                continue
+            previous_keys = [result.get("mutant_key") for result in results.get("mutation_results", [])]
+            for row, dominator_row in dynamic_dominators(KillMatrix.from_dict(results["kill_matrix"])).items():
+                subsumed = current.get(previous_keys[row]) if row < len(previous_keys) else None
+                dominator = current.get(previous_keys[dominator_row]) if dominator_row < len(previous_keys) else None
+                if subsumed is not None and dominator is not None:
+                    dominator_of[subsumed] = dominator
+        
+        # A dominator is always executed, so it cannot itself be subsumed
+        self.dominator_of = {b: a for b, a in dominator_of.items() if a not in dominator_of and a != b}
+    
+    def restrict(self, executable: List[bool]) -> None:
+        """
+        Drop relations whose dominator or subsumed mutant will not be executed
+        
+        Args:
+            executable: Whether each mutant would be executed (e.g. triaged viable)
+        """
+        self.dominator_of = {
+            b: a for b, a in self.dominator_of.items() if executable[a] and executable[b]
+        }
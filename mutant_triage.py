@@ -0,0 +1,136 @@
+import ast
+import bisect
+import __future__
+from types import CodeType
+from typing import Dict, List, Any, Tuple, Optional
+
+from mutation_engine import apply_mutation
+from source_model import SourceModel
+
+# Triage verdicts
+VIABLE = "viable"
+STILLBORN = "stillborn"
+EQUIVALENT = "equivalent"
+
+
+class MutantTriage:
+    """
+    Statically classify mutants before any test is executed
+    
+    Each mutant is compiled: mutants that fail to compile are stillborn, and
+    mutants whose bytecode is identical to the original's are equivalent
+    (trivial compiler equivalence). Neither kind can be killed by a test.
+    
+    Patch-based mutants only recompile the top-level statement they change,
+    so triage cost does not grow with the size of the file.
+    """
+    
+    def __init__(self, source: SourceModel):
+        """
+        Initialize the triage
+        
+        Args:
+            source: Source model of the original code
+        """
+        self.source = source
+        self._signatures: Dict[int, Any] = {}
+        
+        try:
+            body = source.tree.body
+        except SyntaxError:
+            # Nothing can be compared against an original that does not compile
+            body = None
+        
+        self.enabled = body is not None
+        self._statements: List[Tuple[int, int]] = []
+        self._flags = 0
+        if body:
+            for node in body:
+                start = min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])])
+                self._statements.append((start, node.end_lineno))
+                if isinstance(node, ast.ImportFrom) and node.module == "__future__":
+                    for alias in node.names:
+                        feature = getattr(__future__, alias.name, None)
+                        if feature is not None:
+                            self._flags |= feature.compiler_flag
+        self._statement_starts = [start for start, _ in self._statements]
+    
+    def classify(self, mutation: Dict[str, Any]) -> str:
+        """
+        Classify a single mutant
+        
+        Args:
+            mutation: Mutation details
+        
+        Returns:
+            VIABLE, STILLBORN or EQUIVALENT
+        """
+        if not self.enabled:
+            return VIABLE
+        
+        statement = self._find_statement(mutation)
+        if statement is None:
+            # Line-based mutation: compare whole modules
+            original_code, mutated_code, key = self.source.text, apply_mutation(self.source, mutation), -1
+        else:
+            start, end = self._statements[statement]
+            original_code = "".join(self.source.lines[start - 1:end])
+            base = self.source.offset(start, 0)
+            mutation_start = self.source.offset(mutation["line_number"], mutation["col_offset"]) - base
+            mutation_end = self.source.offset(mutation["end_line_number"], mutation["end_col_offset"]) - base
+            mutated_code = original_code[:mutation_start] + mutation["replacement"] + original_code[mutation_end:]
+            key = statement
+        
+        try:
+            mutated_signature = _code_signature(self._compile(mutated_code))
+        except (SyntaxError, ValueError):
+            return STILLBORN
+        
+        if key not in self._signatures:
+            self._signatures[key] = _code_signature(self._compile(original_code))
+        if mutated_signature == self._signatures[key]:
+            return EQUIVALENT
+        return VIABLE
+    
+    def _find_statement(self, mutation: Dict[str, Any]) -> Optional[int]:
+        """Find the top-level statement holding a patch-based mutation"""
+        if "replacement" not in mutation or "col_offset" not in mutation:
+            return None
+        if mutation.get("source_hash") and mutation["source_hash"] != self.source.content_hash:
+            raise ValueError(f"Mutation {mutation.get('mutation_id')} was generated from a different source")
+        
+        index = bisect.bisect_right(self._statement_starts, mutation["line_number"]) - 1
+        if index < 0:
+            return None
+        start, end = self._statements[index]
+        if mutation["end_line_number"] > end:
+            return None
+        return index
+    
+    def _compile(self, code: str) -> CodeType:
+        return compile(code, self.source.path or "<mutant>", "exec", flags=self._flags, dont_inherit=True)
+
+
+def _code_signature(code: CodeType) -> Tuple:
+    """
+    Reduce a code object to the parts that define its behaviour
+    
+    Line numbers, positions and file names are left out so that only real
+    bytecode differences count.
+    """
+    constants = tuple(
+        _code_signature(const) if isinstance(const, CodeType) else (type(const).__name__, repr(const))
+        for const in code.co_consts
+    )
+    return (
+        code.co_code,
+        constants,
+        code.co_names,
+        code.co_varnames,
+        code.co_freevars,
+        code.co_cellvars,
+        code.co_flags,
+        code.co_argcount,
+        code.co_kwonlyargcount,
+        getattr(code, "co_exceptiontable", b""),
+    )
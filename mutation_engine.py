@@ -6,9 +6,297 @@ import tempfile
 import subprocess
 import shutil
 import re
+import bisect
+import tokenize
 from pathlib import Path
 import git
-from typing import List, Dict, Any, Union, Optional
+from typing import List, Dict, Any, Union, Optional, Tuple
+
+from source_model import SourceModel
+
+# Operator replacements applied by the mutation engine, keyed by AST operator type.
+# Each entry is (operator symbol, replacement symbol, description).
+BINOP_MUTATIONS = {
+    ast.Add: ("+", "-", "Change + to -"),
+    ast.Sub: ("-", "+", "Change - to +"),
+    ast.Mult: ("*", "/", "Change * to /"),
+    ast.Div: ("/", "*", "Change / to *"),
+}
+
+COMPARE_MUTATIONS = {
+    ast.Eq: ("==", "!=", "Change == to !="),
+    ast.NotEq: ("!=", "==", "Change != to =="),
+    ast.Gt: (">", "<=", "Change > to <="),
+    ast.Lt: ("<", ">=", "Change < to >="),
+    ast.GtE: (">=", "<", "Change >= to <"),
+    ast.LtE: ("<=", ">", "Change <= to >"),
+}
+
+BOOLOP_MUTATIONS = {
+    ast.And: ("and", "or", "Change and to or"),
+    ast.Or: ("or", "and", "Change or to and"),
+}
+
+# Keyword tokens that can be mutation sites (all other sites are OP tokens)
+MUTABLE_KEYWORDS = {"and", "or", "True", "False"}
+
+
+class MutationSiteVisitor(ast.NodeVisitor):
+    """
+    Find every mutation site of a module in a single AST traversal
+    
+    Only code inside function bodies is mutated. Each site records the exact
+    line/column span of the text to replace (1-based lines, 0-based character
+    columns, end exclusive), so every site yields exactly one mutant.
+    
+    Operators and boolean keywords are matched against the token stream, so
+    text inside strings, docstrings and comments is never a candidate.
+    """
+    
+    def __init__(self, source: SourceModel):
+        """
+        Initialize the visitor
+        
+        Args:
+            source: Source model of the module being visited
+        """
+        self.source = source
+        self.sites: List[Dict[str, Any]] = []
+        self._scope: List[str] = []
+        self._function_depth = 0
+        
+        # Index the real operator and keyword tokens by (line, column)
+        candidates = [
+            token for token in source.tokens
+            if token.type == tokenize.OP or (token.type == tokenize.NAME and token.string in MUTABLE_KEYWORDS)
+        ]
+        self._token_positions = [token.start for token in candidates]
+        self._token_strings = [token.string for token in candidates]
+        self._tokens_by_position = dict(zip(self._token_positions, self._token_strings))
+    
+    def visit_FunctionDef(self, node: ast.AST) -> None:
+        # Decorators, defaults and annotations run at definition time, so only the body is mutated
+        self._scope.append(node.name)
+        self._function_depth += 1
+        for statement in node.body:
+            self.visit(statement)
+        self._function_depth -= 1
+        self._scope.pop()
+    
+    visit_AsyncFunctionDef = visit_FunctionDef
+    
+    def visit_ClassDef(self, node: ast.ClassDef) -> None:
+        self._scope.append(node.name)
+        self.generic_visit(node)
+        self._scope.pop()
+    
+    def visit_BinOp(self, node: ast.BinOp) -> None:
+        mutation = BINOP_MUTATIONS.get(type(node.op))
+        if mutation:
+            self._add_operator_site(node.left, node.right, *mutation, "BinOp")
+        self.generic_visit(node)
+    
+    def visit_AugAssign(self, node: ast.AugAssign) -> None:
+        mutation = BINOP_MUTATIONS.get(type(node.op))
+        if mutation:
+            symbol, replacement, description = mutation
+            self._add_operator_site(node.target, node.value, symbol + "=", replacement + "=", description, "AugAssign")
+        self.generic_visit(node)
+    
+    def visit_Compare(self, node: ast.Compare) -> None:
+        operands = [node.left] + node.comparators
+        for op, left, right in zip(node.ops, operands, operands[1:]):
+            mutation = COMPARE_MUTATIONS.get(type(op))
+            if mutation:
+                self._add_operator_site(left, right, *mutation, "Compare")
+        self.generic_visit(node)
+    
+    def visit_BoolOp(self, node: ast.BoolOp) -> None:
+        mutation = BOOLOP_MUTATIONS[type(node.op)]
+        for left, right in zip(node.values, node.values[1:]):
+            self._add_operator_site(left, right, *mutation, "BoolOp")
+        self.generic_visit(node)
+    
+    def visit_Constant(self, node: ast.Constant) -> None:
+        if node.value is True or node.value is False:
+            position = (node.lineno, self.source.char_col(node.lineno, node.col_offset))
+            if self._tokens_by_position.get(position) == str(node.value):
+                replacement = str(not node.value)
+                self._add_node_site(node, replacement, f"Change {node.value} to {replacement}", "Constant")
+    
+    def visit_Return(self, node: ast.Return) -> None:
+        value = node.value
+        if value is not None and not (isinstance(value, ast.Constant) and value.value is None):
+            self._add_node_site(value, "None", "Replace return value with None", "Return")
+            if isinstance(value, ast.Name):
+                self._add_node_site(value, f"not {value.id}", "Negate return value", "Return")
+        self.generic_visit(node)
+    
+    def _add_node_site(self, node: ast.AST, replacement: str, description: str, operator: str) -> None:
+        """Record a site that replaces the full source span of a node"""
+        if not self._function_depth:
+            return
+        self._add_site(
+            node.lineno, self.source.char_col(node.lineno, node.col_offset),
+            node.end_lineno, self.source.char_col(node.end_lineno, node.end_col_offset),
+            replacement, description, operator
+        )
+    
+    def _add_operator_site(self, left: ast.AST, right: ast.AST, symbol: str, replacement: str,
+                           description: str, operator: str) -> None:
+        """Record a site that replaces the operator written between two operands"""
+        if not self._function_depth:
+            return
+        position = self._locate_operator(
+            (left.end_lineno, self.source.char_col(left.end_lineno, left.end_col_offset)),
+            (right.lineno, self.source.char_col(right.lineno, right.col_offset)),
+            symbol
+        )
+        if position is None:
+            return
+        line, col = position
+        self._add_site(line, col, line, col + len(symbol), replacement, description, operator)
+    
+    def _add_site(self, line: int, col: int, end_line: int, end_col: int,
+                  replacement: str, description: str, operator: str) -> None:
+        self.sites.append({
+            "line_number": line,
+            "col_offset": col,
+            "end_line_number": end_line,
+            "end_col_offset": end_col,
+            "replacement": replacement,
+            "description": description,
+            "operator": operator,
+            "function": ".".join(self._scope),
+        })
+    
+    def _locate_operator(self, start: Tuple[int, int], end: Tuple[int, int], symbol: str) -> Optional[Tuple[int, int]]:
+        """
+        Find the operator token in the gap between two operands
+        
+        Returns None when the operator is not a real token, e.g. for
+        expressions inside f-strings on Python versions that tokenize
+        f-strings as a single string.
+        """
+        index = bisect.bisect_left(self._token_positions, start)
+        while index < len(self._token_positions) and self._token_positions[index] < end:
+            if self._token_strings[index] == symbol:
+                return self._token_positions[index]
+            index += 1
+        return None
+
+
+def apply_mutation(source: Union[str, SourceModel], mutation: Dict[str, Any]) -> str:
+    """
+    Build the full mutated source for a mutation
+    
+    Patch-based records (span plus replacement text) are applied exactly.
+    Older line-based records, such as custom mutations sent to the API,
+    replace original_code with mutated_code on their line.
+    
+    Args:
+        source: Original source code (or its SourceModel) the mutation was generated from
+        mutation: Mutation details
+        
+    Returns:
+        Mutated source code (the original source if the mutation cannot be applied)
+    """
+    if not isinstance(source, SourceModel):
+        source = SourceModel(source)
+    
+    if "replacement" in mutation and "col_offset" in mutation:
+        if mutation.get("source_hash") and mutation["source_hash"] != source.content_hash:
+            raise ValueError(f"Mutation {mutation.get('mutation_id')} was generated from a different source")
+        
+        return source.replace(
+            mutation["line_number"], mutation["col_offset"],
+            mutation["end_line_number"], mutation["end_col_offset"],
+            mutation["replacement"]
+        )
+    
+    if "mutated_full_code" in mutation:
+        return mutation["mutated_full_code"]
+    
+    line_number = mutation.get("line_number", mutation.get("line"))
+    if line_number and mutation.get("original_code") and "mutated_code" in mutation:
+        if 0 < line_number <= len(source.lines):
+            col = _find_code_outside_literals(source, line_number, mutation["original_code"])
+            if col is not None:
+                return source.replace(
+                    line_number, col,
+                    line_number, col + len(mutation["original_code"]),
+                    mutation["mutated_code"]
+                )
+    
+    return source.text
+
+
+def apply_mutations(source: Union[str, SourceModel], mutations: List[Dict[str, Any]]) -> str:
+    """
+    Build the source with several patch-based mutations applied at once
+    
+    Args:
+        source: Original source code (or its SourceModel) the mutations were generated from
+        mutations: Patch-based mutation details with non-overlapping spans
+    
+    Returns:
+        Mutated source code
+    """
+    if not isinstance(source, SourceModel):
+        source = SourceModel(source)
+    
+    patches = []
+    for mutation in mutations:
+        if "replacement" not in mutation or "col_offset" not in mutation:
+            raise ValueError(f"Mutation {mutation.get('mutation_id')} is not patch-based")
+        if mutation.get("source_hash") and mutation["source_hash"] != source.content_hash:
+            raise ValueError(f"Mutation {mutation.get('mutation_id')} was generated from a different source")
+        patches.append((
+            source.offset(mutation["line_number"], mutation["col_offset"]),
+            source.offset(mutation["end_line_number"], mutation["end_col_offset"]),
+            mutation["replacement"],
+        ))
+    
+    # Apply from the end so earlier offsets stay valid
+    text = source.text
+    previous_start = len(text)
+    for start, end, replacement in sorted(patches, reverse=True):
+        if end > previous_start:
+            raise ValueError("Mutations overlap")
+        text = text[:start] + replacement + text[end:]
+        previous_start = start
+    return text
+
+
+def _find_code_outside_literals(source: SourceModel, line_number: int, code: str) -> Optional[int]:
+    """
+    Find code on a line, skipping matches that start inside a string or comment
+    
+    Args:
+        source: Source model of the original code
+        line_number: 1-based line to search
+        code: Code to find
+        
+    Returns:
+        Character column of the first match outside literals, or None
+    """
+    line = source.lines[line_number - 1]
+    try:
+        literal_spans = [
+            (token.start, token.end) for token in source.tokens
+            if token.type in (tokenize.STRING, tokenize.COMMENT)
+            and token.start[0] <= line_number <= token.end[0]
+        ]
+    except SyntaxError:
+        literal_spans = []
+    
+    col = line.find(code)
+    while col != -1:
+        if not any(start <= (line_number, col) < end for start, end in literal_spans):
+            return col
+        col = line.find(code, col + 1)
+    return None
+
 
 class MutationEngine:
     """
@@ -27,12 +315,13 @@ class MutationEngine:
         # Add debug flag
         self.debug = True
     
-    def generate_mutations(self, source_file: str) -> List[Dict[str, Any]]:
+    def generate_mutations(self, source_file: str, source: Optional[SourceModel] = None) -> List[Dict[str, Any]]:
         """
         Generate mutations for the given source file
         
         Args:
             source_file: Path to the Python source file
+            source: Already-loaded SourceModel of the file (optional, read from disk if omitted)
             
         Returns:
             List of mutation details including original and mutated code
@@ -41,18 +330,19 @@ class MutationEngine:
             # Attempt to use mutmut if available
             if self.debug:
                 print(f"Attempting to generate mutations for {source_file}")
-            return self._generate_mutations_with_mutmut(source_file)
+            return self._generate_mutations_with_mutmut(source_file, source)
         except (ImportError, subprocess.CalledProcessError) as e:
             print(f"Falling back to custom mutation engine: {e}")
             # Fallback to custom implementation
-            return self._generate_mutations_custom(source_file)
+            return self._generate_mutations_custom(source_file, source)
     
-    def _generate_mutations_with_mutmut(self, source_file: str) -> List[Dict[str, Any]]:
+    def _generate_mutations_with_mutmut(self, source_file: str, source: Optional[SourceModel] = None) -> List[Dict[str, Any]]:
         """
         Generate mutations using mutmut
         
         Args:
             source_file: Path to the Python source file
+            source: Already-loaded SourceModel of the file (used by the custom fallback)
             
         Returns:
             List of mutation details
@@ -169,225 +459,78 @@ class MutationEngine:
         except Exception as e:
             print(f"Error using mutmut: {e}")
             # Fallback to custom implementation if mutmut fails
-            return self._generate_mutations_custom(source_file)
+            return self._generate_mutations_custom(source_file, source)
     
-    def _generate_mutations_custom(self, source_file: str) -> List[Dict[str, Any]]:
+    def _generate_mutations_custom(self, source_file: str, source: Optional[SourceModel] = None) -> List[Dict[str, Any]]:
         """
         Generate mutations using custom implementation
         
         Args:
             source_file: Path to the Python source file
+            source: Already-loaded SourceModel of the file (optional, read from disk if omitted)
             
         Returns:
             List of mutation details
         """
-        mutations = []
-        
-        # Read the source file
-        with open(source_file, 'r') as f:
-            content = f.read()
+        if source is None:
+            source = SourceModel.from_file(source_file)
         
         if self.debug:
-            print(f"File content length: {len(content)}")
+            print(f"File content length: {len(source.text)}")
         
         # Parse the code
         try:
-            tree = ast.parse(content)
+            tree = source.tree
         except SyntaxError:
             print(f"Syntax error in {source_file}. Skipping mutation.")
             return []
         
-        # Find functions and methods to mutate
-        for node in ast.walk(tree):
-            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
-                # Get function source
-                func_lines = content.splitlines()[node.lineno-1:node.end_lineno]
-                func_source = '\n'.join(func_lines)
-                
-                if self.debug:
-                    print(f"Found function {node.name} at lines {node.lineno}-{node.end_lineno}")
-                    print(f"Function source: {func_source[:100]}...")
-                
-                # Define mutation operators
-                new_mutations = self._apply_mutations(source_file, func_source, node.lineno)
-                if self.debug:
-                    print(f"Generated {len(new_mutations)} mutations for function {node.name}")
-                
-                mutations.extend(new_mutations)
+        # Collect every mutation site in a single pass over the module
+        visitor = MutationSiteVisitor(source)
+        visitor.visit(tree)
+        
+        mutations = [self._create_mutation(source, site) for site in visitor.sites]
         
         if self.debug:
             print(f"Total mutations generated: {len(mutations)}")
             
         return mutations
     
-    def _apply_mutations(self, source_file: str, func_source: str, start_line: int) -> List[Dict[str, Any]]:
+    def _create_mutation(self, source: SourceModel, site: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Apply various mutation operators to the function source
+        Build a compact, patch-based mutation record from a mutation site
+        
+        The record only holds the span to replace and its replacement text;
+        use apply_mutation() to build the full mutated source when needed.
         
         Args:
-            source_file: Original source file path
-            func_source: Function source code to mutate
-            start_line: Starting line number of the function
+            source: Source model of the mutated file
+            site: Mutation site found by MutationSiteVisitor
             
         Returns:
-            List of mutations
+            Mutation details
         """
-        mutations = []
-        lines = func_source.splitlines()
+        lines = source.lines
+        first = lines[site["line_number"] - 1]
+        last = lines[site["end_line_number"] - 1]
+        original_lines = lines[site["line_number"] - 1:site["end_line_number"]]
+        mutated_line = first[:site["col_offset"]] + site["replacement"] + last[site["end_col_offset"]:]
         
-        if self.debug:
-            print(f"Applying mutations to function starting at line {start_line}")
-            print(f"Function has {len(lines)} lines")
-        
-        # Read the full file content
-        with open(source_file, 'r') as f:
-            full_content = f.read()
-        
-        # Define mutation operators
-        operators = [
-            # Arithmetic operators
-            (r'(\W)(\+)(\W)', r'\1-\3', "Change + to -"),
-            (r'(\W)(-)(\W)', r'\1+\3', "Change - to +"),
-            (r'(\W)(\*)(\W)', r'\1/\3', "Change * to /"),
-            (r'(\W)(/)(\W)', r'\1*\3', "Change / to *"),
-            # Relational operators
-            (r'(\W)(==)(\W)', r'\1!=\3', "Change == to !="),
-            (r'(\W)(!=)(\W)', r'\1==\3', "Change != to =="),
-            (r'(\W)(>)(\W)', r'\1<=\3', "Change > to <="),
-            (r'(\W)(<)(\W)', r'\1>=\3', "Change < to >="),
-            (r'(\W)(>=)(\W)', r'\1<\3', "Change >= to <"),
-            (r'(\W)(<=)(\W)', r'\1>\3', "Change <= to >"),
-            # Logical operators
-            (r'(\W)(and)(\W)', r'\1or\3', "Change and to or"),
-            (r'(\W)(or)(\W)', r'\1and\3', "Change or to and"),
-            # Boolean literals
-            (r'(\W)(True)(\W)', r'\1False\3', "Change True to False"),
-            (r'(\W)(False)(\W)', r'\1True\3', "Change False to True"),
-            # Add basic mutations for function calls and returns
-            (r'(\s*)(return\s+)(.+?)([\n;])', r'\1return None\4', "Replace return value with None"),
-            (r'(\s*)(return\s+)(\w+)([\n;])', r'\1return not \3\4', "Negate return value"),
-        ]
-        
-        # Create a separate list for return statement mutations
-        return_mutations = []
-        
-        # Check each line for return statements
-        for i, line in enumerate(lines):
-            line_number = start_line + i
-            
-            # Skip comment and empty lines
-            if line.strip().startswith('#') or not line.strip():
-                continue
-            
-            # Check for return statement
-            if "return " in line and not line.strip().startswith('#'):
-                # Create a basic mutation for the return statement
-                orig_line = line
-                
-                if self.debug:
-                    print(f"Found return statement: {line} at line {line_number}")
-                
-                # Create a modified version of the full file content with a 'MUTATED' return
-                file_lines = full_content.splitlines()
-                mutated_line = line.replace("return ", "return 'MUTATED_' + str(")
-                # Check if there's a value after return
-                if not line.strip().endswith("return"):
-                    mutated_line += ")"
-                file_lines[line_number-1] = mutated_line
-                mutated_content = "\n".join(file_lines)
-                
-                mutation = {
-                    "mutation_id": str(uuid.uuid4()),
-                    "line_number": line_number,
-                    "original_code": orig_line.strip(),
-                    "mutated_code": mutated_line.strip(),
-                    "mutation_description": "Force mutation: change return value",
-                    "mutated_full_code": mutated_content,
-                    "was_detected": False
-                }
-                return_mutations.append(mutation)
-                if self.debug:
-                    print(f"Created return mutation: {mutation['mutated_code']}")
-        
-        # Apply standard mutation operators to each line
-        for i, line in enumerate(lines):
-            line_number = start_line + i
-            
-            # Skip comment and empty lines
-            if line.strip().startswith('#') or not line.strip():
-                continue
-            
-            for pattern, replacement, description in operators:
-                # Try to find matches for the pattern
-                if re.search(pattern, line):
-                    if self.debug:
-                        print(f"Found pattern match: {pattern} in line {line_number}: {line}")
-                    
-                    # Apply the mutation
-                    mutated_line = re.sub(pattern, replacement, line)
-                    
-                    # Skip if mutation didn't change anything
-                    if mutated_line == line:
-                        continue
-                    
-                    # Create a modified version of the full file content
-                    file_lines = full_content.splitlines()
-                    file_lines[line_number-1] = mutated_line
-                    mutated_content = "\n".join(file_lines)
-                    
-                    # Create the mutation record
-                    mutation = {
-                        "mutation_id": str(uuid.uuid4()),
-                        "line_number": line_number,
-                        "original_code": line.strip(),
-                        "mutated_code": mutated_line.strip(),
-                        "mutation_description": description,
-                        "mutated_full_code": mutated_content,
-                        "was_detected": False
-                    }
-                    
-                    mutations.append(mutation)
-                    if self.debug:
-                        print(f"Created mutation: {description} at line {line_number}")
-        
-        # If no standard mutations were found, use the return mutations
-        if not mutations and return_mutations:
-            if self.debug:
-                print("No regular mutations found, using return mutations")
-            mutations = return_mutations
-            
-        # If still no mutations, create a simple forced mutation on the first non-empty line
-        if not mutations:
-            if self.debug:
-                print("No mutations found, creating forced mutation")
-            for i, line in enumerate(lines):
-                if line.strip() and not line.strip().startswith('#'):
-                    line_number = start_line + i
-                    mutated_line = line + " # FORCED MUTATION"
-                    
-                    # Create a modified version of the full file content
-                    file_lines = full_content.splitlines()
-                    file_lines[line_number-1] = mutated_line
-                    mutated_content = "\n".join(file_lines)
-                    
-                    mutation = {
-                        "mutation_id": str(uuid.uuid4()),
-                        "line_number": line_number,
-                        "original_code": line.strip(),
-                        "mutated_code": mutated_line.strip(),
-                        "mutation_description": "Forced mutation for simple code",
-                        "mutated_full_code": mutated_content,
-                        "was_detected": False
-                    }
-                    mutations.append(mutation)
-                    if self.debug:
-                        print(f"Created forced mutation at line {line_number}: {mutated_line}")
-                    break
-        
-        if self.debug:
-            print(f"Returning {len(mutations)} mutations")
-            
-        return mutations
+        return {
+            "mutation_id": str(uuid.uuid4()),
+            "source_hash": source.content_hash,
+            "line_number": site["line_number"],
+            "col_offset": site["col_offset"],
+            "end_line_number": site["end_line_number"],
+            "end_col_offset": site["end_col_offset"],
+            "replacement": site["replacement"],
+            "function": site["function"],
+            "mutation_operator": site["operator"],
+            "original_code": "".join(original_lines).strip(),
+            "mutated_code": mutated_line.strip(),
+            "mutation_description": site["description"],
+            "was_detected": False
+        }
     
     def clone_github_repo(self, repo_url: str, branch: str = 'main', target_dir: Optional[str] = None) -> str:
         """
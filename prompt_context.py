@@ -0,0 +1,223 @@
+import ast
+import difflib
+from typing import Dict, List, Any, Tuple, Optional, Set
+
+from source_model import SourceModel
+
+# Lines of dependencies added to a slice after the mutated function itself
+MAX_CONTEXT_LINES = 150
+
+# Line that marks code left out of a slice
+ELISION = "# ...\n"
+
+_DEFINITIONS = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+
+def compact_diff(original_code: str, mutated_code: str, context: int = 1) -> str:
+    """
+    Unified diff of a mutation with little context
+    
+    Args:
+        original_code: The original Python code
+        mutated_code: The mutated Python code
+        context: Unchanged lines shown around each change
+    
+    Returns:
+        The diff text (hunks only, without file headers)
+    """
+    lines = difflib.unified_diff(
+        original_code.splitlines(keepends=True), mutated_code.splitlines(keepends=True), n=context
+    )
+    return "".join(line if line.endswith("\n") else line + "\n" for line in list(lines)[2:])
+
+
+def changed_line(original_code: str, mutated_code: str) -> Optional[int]:
+    """
+    First line a mutation changes
+    
+    Args:
+        original_code: The original Python code
+        mutated_code: The mutated Python code
+    
+    Returns:
+        1-based line number in the original code, or None if nothing changed
+    """
+    matcher = difflib.SequenceMatcher(None, original_code.splitlines(), mutated_code.splitlines(), autojunk=False)
+    for tag, original_start, _, _, _ in matcher.get_opcodes():
+        if tag != "equal":
+            return original_start + 1
+    return None
+
+
+class ContextSlicer:
+    """
+    Cut the part of a module a prompt needs to test one function
+    
+    A slice holds the mutated unit (a top-level function, or a method
+    under its class header), then the module-level definitions and
+    imports it references, followed transitively through referenced
+    functions and constants. Referenced classes contribute their header
+    and __init__. Everything is shown in source order, with gaps marked,
+    and the dependencies are bounded by MAX_CONTEXT_LINES, so the prompt
+    size does not grow with the module.
+    """
+    
+    def __init__(self, source: SourceModel, max_lines: int = MAX_CONTEXT_LINES):
+        """
+        Initialize the slicer
+        
+        Args:
+            source: Source model of the module
+            max_lines: Lines of dependencies added after the mutated unit
+        """
+        self.source = source
+        self.max_lines = max_lines
+        # Module-level name -> statements binding it
+        self._bindings: Dict[str, List[ast.stmt]] = {}
+        for node in source.tree.body:
+            for name in _bound_names(node):
+                self._bindings.setdefault(name, []).append(node)
+    
+    def slice_mutation(self, mutated_code: str) -> Optional[str]:
+        """
+        Slice around the unit a mutation changes
+        
+        Args:
+            mutated_code: The mutated Python code
+        
+        Returns:
+            The slice, or None if the mutation is not inside a function
+        """
+        line = changed_line(self.source.text, mutated_code)
+        unit = self._unit_at(line) if line else None
+        return self._render(unit) if unit else None
+    
+    def slice_function(self, function: str) -> Optional[str]:
+        """
+        Slice around a function named the way MutationEngine names it (e.g. "Cart.total")
+        
+        Args:
+            function: Dotted name of the function
+        
+        Returns:
+            The slice, or None if no such function exists
+        """
+        parts = function.split(".")
+        for node in self.source.tree.body:
+            if not isinstance(node, _DEFINITIONS) or node.name != parts[0]:
+                continue
+            if isinstance(node, ast.ClassDef) and len(parts) > 1:
+                for member in node.body:
+                    if isinstance(member, _DEFINITIONS[:2]) and member.name == parts[1]:
+                        return self._render((node, member))
+            elif not isinstance(node, ast.ClassDef):
+                return self._render((None, node))
+        return None
+    
+    def _unit_at(self, line: int) -> Optional[Tuple[Optional[ast.ClassDef], ast.AST]]:
+        """(class, function) of the top-level function or method containing a line"""
+        for node in self.source.tree.body:
+            if not _span(node)[0] <= line <= node.end_lineno:
+                continue
+            if isinstance(node, ast.ClassDef):
+                for member in node.body:
+                    if isinstance(member, _DEFINITIONS[:2]) and _span(member)[0] <= line <= member.end_lineno:
+                        return node, member
+            elif isinstance(node, _DEFINITIONS[:2]):
+                return None, node
+        return None
+    
+    def _render(self, unit: Tuple[Optional[ast.ClassDef], ast.AST]) -> str:
+        """Text of a unit and its dependencies, in source order"""
+        owner, function = unit
+        spans: Set[Tuple[int, int]] = {_span(function)}
+        pending = [function]
+        if owner is not None:
+            spans.add(_header_span(owner))
+            members = {member.name: member for member in owner.body if isinstance(member, _DEFINITIONS[:2])}
+            # Methods called on self, and the constructor that sets up the state
+            for name in sorted(_self_attributes(function) | {"__init__"}):
+                if name in members and members[name] is not function:
+                    spans.add(_span(members[name]))
+                    pending.append(members[name])
+        
+        seen: Set[int] = {id(owner), id(function)}
+        budget = self.max_lines
+        while pending:
+            node = pending.pop(0)
+            for name in sorted(_referenced_names(node)):
+                for binding in self._bindings.get(name, []):
+                    if id(binding) in seen:
+                        continue
+                    seen.add(id(binding))
+                    if isinstance(binding, ast.ClassDef):
+                        added = [_header_span(binding)] + [
+                            _span(member) for member in binding.body
+                            if isinstance(member, _DEFINITIONS[:2]) and member.name == "__init__"
+                        ]
+                    else:
+                        added = [_span(binding)]
+                    size = sum(end - start + 1 for start, end in added)
+                    if size > budget:
+                        continue
+                    budget -= size
+                    spans.update(added)
+                    if not isinstance(binding, (ast.ClassDef, ast.Import, ast.ImportFrom)):
+                        pending.append(binding)
+        return self._join(spans)
+    
+    def _join(self, spans: Set[Tuple[int, int]]) -> str:
+        """Source lines of the spans, merged, with the gaps between them elided"""
+        lines = self.source.lines
+        parts = []
+        last = 0
+        for start, end in sorted(spans):
+            if start <= last:
+                start = last + 1
+            if start > end:
+                continue
+            if parts and start > last + 1:
+                # Only blank lines between two spans need no marker
+                skipped = lines[last:start - 1]
+                parts.append("\n" if not any(line.strip() for line in skipped) else ELISION)
+            parts.extend(line if line.endswith("\n") else line + "\n" for line in lines[start - 1:end])
+            last = end
+        return "".join(parts)
+
+
+def _span(node: ast.AST) -> Tuple[int, int]:
+    """First and last line of a statement, decorators included"""
+    start = min([node.lineno] + [decorator.lineno for decorator in getattr(node, "decorator_list", [])])
+    return start, node.end_lineno
+
+
+def _header_span(node: ast.ClassDef) -> Tuple[int, int]:
+    """Lines of a class statement up to its first body statement"""
+    return _span(node)[0], max(node.lineno, node.body[0].lineno - 1)
+
+
+def _bound_names(node: ast.stmt) -> List[str]:
+    """Names a module-level statement binds"""
+    if isinstance(node, _DEFINITIONS):
+        return [node.name]
+    if isinstance(node, (ast.Import, ast.ImportFrom)):
+        return [alias.asname or alias.name.split(".")[0] for alias in node.names if alias.name != "*"]
+    targets: List[Any] = []
+    if isinstance(node, ast.Assign):
+        targets = node.targets
+    elif isinstance(node, (ast.AnnAssign, ast.AugAssign)):
+        targets = [node.target]
+    return [name.id for target in targets for name in ast.walk(target) if isinstance(name, ast.Name)]
+
+
+def _referenced_names(node: ast.AST) -> Set[str]:
+    """Names a statement reads"""
+    return {name.id for name in ast.walk(node) if isinstance(name, ast.Name) and isinstance(name.ctx, ast.Load)}
+
+
+def _self_attributes(node: ast.AST) -> Set[str]:
+    """Attributes a method reads on self"""
+    return {
+        attribute.attr for attribute in ast.walk(node)
+        if isinstance(attribute, ast.Attribute) and isinstance(attribute.value, ast.Name) and attribute.value.id == "self"
+    }
@@ -0,0 +1,163 @@
+import io
+import ast
+import hashlib
+import tokenize
+from functools import cached_property
+from typing import Tuple, Optional
+
+
+def compute_source_hash(source: str) -> str:
+    """
+    Compute the content hash that patch-based mutations are tied to
+    
+    Args:
+        source: Source code
+    
+    Returns:
+        Hex digest of the source
+    """
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+
+class SourceModel:
+    """
+    An immutable, parsed view of a Python source file
+    
+    The text is read once; line offsets, the AST, the token stream and the
+    content hash are computed on first use and then shared by the mutation
+    engine, the test generator and the test executor.
+    """
+    
+    def __init__(self, text: str, path: Optional[str] = None):
+        """
+        Initialize the source model
+        
+        Args:
+            text: Source code
+            path: Path the source was read from (optional)
+        """
+        self.__dict__["text"] = text
+        self.__dict__["path"] = path
+    
+    @classmethod
+    def from_file(cls, path: str) -> "SourceModel":
+        """
+        Read a source file into a SourceModel
+        
+        Args:
+            path: Path to the Python source file
+        
+        Returns:
+            SourceModel for the file
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(f.read(), path)
+    
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+    
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+    
+    @cached_property
+    def lines(self) -> Tuple[str, ...]:
+        """Source lines with their line endings, split the way the parser counts lines"""
+        return tuple(io.StringIO(self.text, newline="").readlines())
+    
+    @cached_property
+    def line_offsets(self) -> Tuple[int, ...]:
+        """Character offset of the start of each line (index 0 is line 1)"""
+        offsets = [0]
+        for line in self.lines:
+            offsets.append(offsets[-1] + len(line))
+        return tuple(offsets)
+    
+    @cached_property
+    def tree(self) -> ast.Module:
+        """Parsed AST of the source (raises SyntaxError for invalid code)"""
+        return ast.parse(self.text, filename=self.path or "<unknown>")
+    
+    @cached_property
+    def tokens(self) -> Tuple[tokenize.TokenInfo, ...]:
+        """Token stream of the source (raises SyntaxError for invalid code)"""
+        try:
+            return tuple(tokenize.generate_tokens(io.StringIO(self.text).readline))
+        except tokenize.TokenError as e:
+            raise SyntaxError(str(e)) from e
+    
+    @cached_property
+    def statement_starts(self) -> Tuple[int, ...]:
+        """First line of the innermost statement covering each line (index 0 is line 1, 0 outside statements)"""
+        starts = [0] * (len(self.lines) + 1)
+        statements = sorted(
+            (node for node in ast.walk(self.tree) if isinstance(node, ast.stmt)),
+            key=lambda node: (node.lineno, -node.end_lineno)
+        )
+        for node in statements:
+            starts[node.lineno - 1:node.end_lineno] = [node.lineno] * (node.end_lineno - node.lineno + 1)
+        return tuple(starts)
+    
+    @cached_property
+    def content_hash(self) -> str:
+        """Content hash of the source"""
+        return compute_source_hash(self.text)
+    
+    def offset(self, line: int, col: int) -> int:
+        """
+        Convert a position to an offset into the text
+        
+        Args:
+            line: 1-based line number
+            col: 0-based character column
+        
+        Returns:
+            Character offset into the text
+        """
+        return self.line_offsets[line - 1] + col
+    
+    def char_col(self, line: int, byte_col: int) -> int:
+        """
+        Convert an AST column (UTF-8 byte offset) to a character column
+        
+        Args:
+            line: 1-based line number
+            byte_col: Column as reported by the ast module
+        
+        Returns:
+            0-based character column
+        """
+        text = self.lines[line - 1]
+        if text.isascii():
+            return byte_col
+        return len(text.encode("utf-8")[:byte_col].decode("utf-8"))
+    
+    def segment(self, line: int, col: int, end_line: int, end_col: int) -> str:
+        """
+        Get the text of a span
+        
+        Args:
+            line: 1-based start line
+            col: 0-based start character column
+            end_line: 1-based end line
+            end_col: 0-based end character column (exclusive)
+        
+        Returns:
+            Text of the span
+        """
+        return self.text[self.offset(line, col):self.offset(end_line, end_col)]
+    
+    def replace(self, line: int, col: int, end_line: int, end_col: int, replacement: str) -> str:
+        """
+        Build a copy of the text with one span replaced
+        
+        Args:
+            line: 1-based start line
+            col: 0-based start character column
+            end_line: 1-based end line
+            end_col: 0-based end character column (exclusive)
+            replacement: Text to put in place of the span
+        
+        Returns:
+            The modified source text
+        """
+        return self.text[:self.offset(line, col)] + replacement + self.text[self.offset(end_line, end_col):]
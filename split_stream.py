@@ -0,0 +1,174 @@
+import os
+import sys
+import json
+import time
+import runpy
+import signal
+from typing import Dict, Any, Optional, Sequence
+
+from mutant_loader import MutantFinder, module_name_of
+from mutant_schemata import NO_MUTANT, SPLIT_GLOBAL
+
+# Seconds between checks on running mutant processes
+POLL_INTERVAL = 0.001
+
+# Seconds a mutant process gets past its timeout to stop on its own alarm
+KILL_MARGIN = 0.5
+
+
+class SplitStream:
+    """
+    Fork one process per mutant at the first site that reaches it
+    
+    The test runs against the original code in the main stream. The first
+    time a split-stream schemata site is reached, the selector forks a child
+    for every mutant of the site that has not been forked yet; each child
+    continues the test with its mutant active and exits with the verdict,
+    while the main stream continues with the original code. The part of
+    the test before a site is therefore run once for all of its mutants.
+    Mutants whose site is never reached are not covered by the test.
+    """
+    
+    def __init__(self, timeout: float, max_children: Optional[int] = None):
+        """
+        Initialize the stream
+        
+        Args:
+            timeout: Seconds a mutant process may run after its fork
+            max_children: Mutant processes running at once (defaults to the CPU count)
+        """
+        self.timeout = timeout
+        self.max_children = max(1, max_children or os.cpu_count() or 1)
+        self.active = NO_MUTANT
+        self.is_child = False
+        self.forked = set()
+        self.outcomes: Dict[int, Dict[str, Any]] = {}
+        self._children: Dict[int, tuple] = {}
+    
+    def split(self, mutant_ids: Sequence[int]) -> int:
+        """
+        Selector of a reached site (the module's SPLIT_GLOBAL)
+        
+        Args:
+            mutant_ids: Ids of the mutants guarded at the site
+        
+        Returns:
+            Id of the mutant this process runs (NO_MUTANT in the main stream)
+        """
+        if self.is_child:
+            return self.active
+        
+        for mutant_id in mutant_ids:
+            if mutant_id in self.forked:
+                continue
+            self.forked.add(mutant_id)
+            self._reap(self.max_children - 1)
+            
+            pid = os.fork()
+            if pid == 0:
+                self.is_child, self.active, self._children = True, mutant_id, {}
+                # Stop an endless mutant even if the main stream is killed first
+                signal.signal(signal.SIGALRM, signal.SIG_DFL)
+                signal.setitimer(signal.ITIMER_REAL, self.timeout)
+                return mutant_id
+            self._children[pid] = (mutant_id, time.perf_counter())
+        
+        return NO_MUTANT
+    
+    def wait(self) -> Dict[int, Dict[str, Any]]:
+        """
+        Wait for every mutant process
+        
+        Returns:
+            Mutant id -> {"passed", "timed_out", "duration"}
+        """
+        self._reap(0)
+        return self.outcomes
+    
+    def _reap(self, limit: int) -> None:
+        """Collect finished mutant processes until at most limit are running"""
+        while len(self._children) > limit:
+            reaped = False
+            for pid, (mutant_id, started) in list(self._children.items()):
+                finished, status = os.waitpid(pid, os.WNOHANG)
+                duration = time.perf_counter() - started
+                if not finished:
+                    if duration < self.timeout + KILL_MARGIN:
+                        continue
+                    os.kill(pid, signal.SIGKILL)
+                    os.waitpid(pid, 0)
+                    status = None
+                
+                del self._children[pid]
+                reaped = True
+                self.outcomes[mutant_id] = {
+                    "passed": status is not None and os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0,
+                    "timed_out": status is None or (os.WIFSIGNALED(status) and os.WTERMSIG(status) == signal.SIGALRM),
+                    "duration": duration,
+                }
+            if not reaped:
+                time.sleep(POLL_INTERVAL)
+
+
+def run_split(test_file: str, code_file: str, source: str, output_file: str, timeout: float) -> bool:
+    """
+    Run a test file once, splitting off a process per reached mutant
+    
+    Args:
+        test_file: Path to the test file
+        code_file: Path to the original code file
+        source: Split-stream schemata source to serve in place of the code file
+        output_file: JSON file the outcomes are written to (see read_split)
+        timeout: Seconds each mutant process may run after its fork
+    
+    Returns:
+        True if the test passed on the original code
+    """
+    stream = SplitStream(timeout)
+    MutantFinder(module_name_of(code_file), source, code_file, {SPLIT_GLOBAL: stream.split}).install()
+    sys.argv = [test_file]
+    
+    try:
+        runpy.run_path(test_file, run_name="__main__")
+        passed = True
+    except SystemExit as e:
+        passed = e.code in (0, None)
+    except BaseException:
+        passed = False
+    
+    if stream.is_child:
+        os._exit(0 if passed else 1)
+    
+    outcomes = stream.wait()
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump({"passed": passed, "mutants": {str(mutant_id): outcome for mutant_id, outcome in outcomes.items()}}, f)
+    return passed
+
+
+def read_split(output_file: str) -> Optional[Dict[str, Any]]:
+    """
+    Read the outcomes written by run_split
+    
+    Args:
+        output_file: File written by run_split
+    
+    Returns:
+        {"passed", "mutants": {mutant id: outcome}}, or None if the run did
+        not finish
+    """
+    try:
+        with open(output_file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    data["mutants"] = {int(mutant_id): outcome for mutant_id, outcome in data["mutants"].items()}
+    return data
+
+
+if __name__ == "__main__":
+    # Usage: python split_stream.py <code_file> <test_file> <output> <timeout>, schemata source on stdin
+    code, test, output = sys.argv[1:4]
+    schemata_source = sys.stdin.buffer.read().decode("utf-8")
+    # Behave like `python test_file`: the test's directory comes first on sys.path
+    sys.path[0] = os.path.dirname(os.path.abspath(test))
+    sys.exit(0 if run_split(test, code, schemata_source, output, float(sys.argv[4])) else 1)
@@ -0,0 +1,159 @@
+import os
+import difflib
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Union
+
+# Generated tests kept on disk before the least recently used are evicted
+DEFAULT_MAX_ENTRIES = 2000
+
+
+def cache_key(original_code: str, mutated_code: str, model: str, prompt_version: Union[int, str]) -> str:
+    """
+    Content address of a generated test
+    
+    Args:
+        original_code: The original Python code
+        mutated_code: The mutated Python code
+        model: Name of the model that generates the test
+        prompt_version: Version of the prompt template
+    
+    Returns:
+        SHA-256 hex digest of the original code, the mutation diff, the model and the prompt version
+    """
+    diff = "".join(difflib.unified_diff(
+        original_code.splitlines(keepends=True), mutated_code.splitlines(keepends=True), n=0
+    ))
+    digest = hashlib.sha256()
+    for part in (model, str(prompt_version), original_code, diff):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class TestCache:
+    """
+    Persistent content-addressed cache of generated tests
+    
+    Every test is stored as one file named by its key (see cache_key), so
+    the cache survives restarts and can be shared by several processes.
+    The directory is scanned once, when the cache is created; after that
+    an in-memory index in least-recently-used order tracks the entries
+    this process knows of, and once it holds more than max_entries the
+    least recently used files are deleted. A read also refreshes the
+    file's modification time, which orders the index of the next process.
+    """
+    
+    def __init__(self, directory: str, max_entries: int = DEFAULT_MAX_ENTRIES):
+        """
+        Initialize the cache
+        
+        Args:
+            directory: Directory the tests are stored in (created if missing)
+            max_entries: Tests kept before the least recently used are evicted
+        """
+        self.directory = os.path.abspath(directory)
+        self.max_entries = max(1, int(max_entries))
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        
+        # File name -> None, least recently used first
+        self._index = OrderedDict()
+        for name in sorted(self._scan(), key=self._last_used):
+            self._index[name] = None
+        self._evict()
+    
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a generated test
+        
+        Args:
+            key: Cache key of the test
+        
+        Returns:
+            The test code, or None if it is not cached
+        """
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                test_code = f.read()
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        
+        with self._lock:
+            self.hits += 1
+            self._touch(os.path.basename(path))
+        return test_code
+    
+    def put(self, key: str, test_code: str) -> None:
+        """
+        Store a generated test and evict the least recently used ones over the limit
+        
+        Args:
+            key: Cache key of the test
+            test_code: Generated test code
+        """
+        path = self._path(key)
+        # Write aside and rename, so readers never see a partial file
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                f.write(test_code)
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"Could not cache generated test: {e}")
+            return
+        
+        with self._lock:
+            self._touch(os.path.basename(path))
+            self._evict()
+    
+    def stats(self) -> Dict[str, int]:
+        """
+        Cache counters
+        
+        Returns:
+            Dictionary with "entries", "hits", "misses" and "evictions"
+        """
+        with self._lock:
+            return {
+                "entries": len(self._index),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+    
+    def _touch(self, name: str) -> None:
+        """Mark an entry as the most recently used"""
+        self._index[name] = None
+        self._index.move_to_end(name)
+    
+    def _evict(self) -> None:
+        """Delete the least recently used entries over max_entries"""
+        while len(self._index) > self.max_entries:
+            name, _ = self._index.popitem(last=False)
+            try:
+                os.remove(os.path.join(self.directory, name))
+                self.evictions += 1
+            except OSError:
+                pass
+    
+    def _last_used(self, name: str) -> float:
+        try:
+            return os.path.getmtime(os.path.join(self.directory, name))
+        except OSError:
+            return 0.0
+    
+    def _scan(self):
+        """File names of the cached tests on disk"""
+        return [name for name in os.listdir(self.directory) if name.endswith(".py")]
+    
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.py")
@@ -1,30 +1,190 @@
 import os
 import sys
 import json
+import time
+import queue
+import statistics
 import subprocess
-import tempfile
-from typing import Dict, List, Any, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Tuple, Optional, Callable, Iterable
+
+import numpy as np
+
+from mutation_engine import apply_mutation, apply_mutations
+from mutant_triage import MutantTriage, VIABLE, STILLBORN, EQUIVALENT
+from mutant_schemata import SchemataCompiler, ACTIVE_MUTANT_ENV
+from mutant_loader import write_compiled
+from source_model import SourceModel
+from fork_server import ForkServer
+from line_coverage import read_covered_lines, build_line_index
+from kill_history import KillHistory
+from test_session import read_session, case_file, CASE_SEPARATOR
+from split_stream import read_split
+from kill_matrix import KillMatrix
+from mutant_subsumption import MutantReducer, mutant_key, test_key
+from mutant_sampling import MutantSampler, wilson_interval, UNIFORM, STRATIFIED
+
+# Seconds a single test run may take before it is killed (baseline runs)
+DEFAULT_TEST_TIMEOUT = 5
+
+# Timeout of a test against a mutant: factor * mean + deviations * stdev + margin,
+# but at least MIN_TEST_TIMEOUT seconds
+TIMEOUT_FACTOR = 2.0
+TIMEOUT_DEVIATIONS = 3.0
+TIMEOUT_MARGIN = 0.5
+MIN_TEST_TIMEOUT = 1.0
+
+# Runs a test file under line tracing (python line_coverage.py <target> <output> <test>)
+LINE_COVERAGE_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "line_coverage.py")
+
+# Runs a test file with a mutant read from stdin (or a compiled schemata file)
+# served in place of the code file (python mutant_loader.py <code_file> <test_file> [<compiled_file>])
+MUTANT_LOADER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mutant_loader.py")
+
+# Compiled mutant-schemata module of a run, in the temp directory
+SCHEMATA_FILE = "schemata.marshal"
+
+# Runs a whole test session in one process (python test_session.py, JSON config on stdin)
+TEST_SESSION_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "test_session.py")
+
+# Runs a test file split-stream with schemata read from stdin
+# (python split_stream.py <code_file> <test_file> <output> <timeout>)
+SPLIT_STREAM_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "split_stream.py")
+
+# Status of a mutant on a line that no passing test executes
+NOT_COVERED = "not_covered"
+
+# Status of a mutant that was only detected by tests running out of time
+TIMEOUT = "timeout"
+
+# Status of a mutant left out of the sample in sampling mode
+NOT_SAMPLED = "not_sampled"
+
+# Killable mutants evaluated before sampling may stop on the interval width
+MIN_SAMPLE_SIZE = 10
 
 class TestExecutor:
     """
     A class to execute tests against original and mutated code and collect results
     """
     
-    def __init__(self, temp_dir: str):
+    def __init__(self, temp_dir: str, use_schemata: bool = False, backend: str = "subprocess", workers: int = 1,
+                 first_kill: bool = False, coverage: bool = False, prioritize: bool = False,
+                 calibration_runs: int = 3, session: bool = False, reduce_mutants: bool = False,
+                 previous_results: Optional[List[Dict[str, Any]]] = None,
+                 sampling: Optional[str] = None, ci_width: float = 10.0, confidence: float = 0.95,
+                 sample_seed: Optional[int] = None, group_size: int = 0, split_stream: bool = False):
         """
         Initialize the test executor
         
+        reduce_mutants, sampling, group_size > 1 and split_stream each decide
+        which mutants are executed and how, so at most one of them may be
+        enabled (a ValueError is raised otherwise); split_stream cannot be
+        combined with session either. An unknown sampling strategy, a
+        confidence outside (0, 1) or a non-positive ci_width raise a
+        ValueError as well.
+        
         Args:
             temp_dir: Path to temporary directory for test files
+            use_schemata: Compile all mutants into one mutant-schemata module and
+                select each mutant with an environment variable instead of
+                building the source of every mutant
+            backend: How each test is run: "subprocess" starts a fresh interpreter
+                per run, "fork" forks it from a preloaded fork server
+            workers: Number of mutants evaluated in parallel, each in its own
+                working directory
+            first_kill: Stop running tests against a mutant as soon as one test
+                kills it (killed/survived verdicts only, detected_by_tests then
+                holds just the killing test)
+            coverage: Record the lines each test executes on the original code;
+                mutants on lines no test reaches are reported as not covered
+                without running anything, and every other mutant only runs the
+                tests that execute its statement
+            prioritize: Run the tests against each mutant in the order of their
+                past kills of similar mutants (same line, function, operator)
+                per second of runtime; best combined with first_kill
+            calibration_runs: Times each test is run against the original code;
+                the runtimes set each test's timeout against mutants, and tests
+                whose result changes between runs are flaky and never used to
+                decide a kill
+            session: Run all selected test files for a mutant in one pytest (or
+                unittest) session instead of one process per file; outcomes,
+                coverage, timeouts, flakiness and kills are then tracked per
+                test case, and pytest-style tests are collected as well
+            reduce_mutants: Execute dominator mutants first and infer the verdict
+                of the mutants they subsume when the dominator is killed
+            previous_results: Results of earlier runs on the same code (with any
+                tests) whose kill matrices supply the dominator relations
+            sampling: Estimate the score from a sample of mutants drawn "uniform"ly
+                or "stratified" by function and operator (None evaluates all)
+            ci_width: Stop sampling once the Wilson interval of the detection
+                rate is at most this many percentage points wide
+            confidence: Confidence level of the interval
+            sample_seed: Random seed of the sample (optional)
+            group_size: Run up to this many mutants of different functions
+                together and only split a group (by bisection) when its
+                tests kill it; pays off when most mutants survive (0 or 1
+                evaluates each mutant on its own)
+            split_stream: Run each test once against split-stream schemata that
+                fork one process per mutant when its site is first reached,
+                so the test prefix before a site is shared by its mutants
+                (needs os.fork)
         """
-        self.temp_dir = temp_dir
+        if backend not in ("subprocess", "fork"):
+            raise ValueError(f"Unknown test backend: {backend}")
+        modes = [
+            name for name, enabled in (("reduce_mutants", reduce_mutants), ("sampling", sampling),
+                                       ("group_size", int(group_size) > 1), ("split_stream", split_stream))
+            if enabled
+        ]
+        if len(modes) > 1:
+            raise ValueError(f"Evaluation modes cannot be combined: {', '.join(modes)}")
+        if split_stream and session:
+            raise ValueError("split_stream cannot be combined with session")
+        if sampling:
+            if sampling not in (UNIFORM, STRATIFIED):
+                raise ValueError(f"Unknown sampling strategy: {sampling}")
+            if not 0 < confidence < 1:
+                raise ValueError(f"confidence must be between 0 and 1, got {confidence}")
+            if not ci_width > 0:
+                raise ValueError(f"ci_width must be positive, got {ci_width}")
+        if backend == "fork" and not ForkServer.is_supported():
+            print("Fork server is not supported on this platform, using subprocesses")
+            backend = "subprocess"
+        
+        self.temp_dir = os.path.abspath(temp_dir)
+        self.use_schemata = use_schemata
+        self.backend = backend
+        self.workers = max(1, int(workers))
+        self.first_kill = first_kill
+        self.coverage = coverage
+        self.prioritize = prioritize
+        self.calibration_runs = max(1, int(calibration_runs))
+        self.session = session
+        self.reduce_mutants = reduce_mutants
+        self.previous_results = previous_results or []
+        self.sampling = sampling
+        self.ci_width = ci_width
+        self.confidence = confidence
+        self.sample_seed = sample_seed
+        self.group_size = max(0, int(group_size))
+        if split_stream and not ForkServer.is_supported():
+            print("Split-stream execution needs fork, running every mutant on its own")
+            split_stream = False
+        self.split_stream = split_stream
+        # Kept across run_tests calls: tests are remembered by their code, so
+        # a test run again (another file, a later round) keeps its past kills
+        self.kill_history = KillHistory()
+        self._workers: List[Dict[str, Any]] = []
         # Make sure the directory for test files exists
         os.makedirs(os.path.join(self.temp_dir, "tests"), exist_ok=True)
         
     def run_tests(self, 
                  code_file: str, 
                  mutations: List[Dict[str, Any]], 
-                 tests: List[Dict[str, Any]]) -> Dict[str, Any]:
+                 tests: List[Dict[str, Any]],
+                 source: Optional[SourceModel] = None,
+                 first_test_file: int = 0) -> Dict[str, Any]:
         """
         Run all tests against original and mutated code
         
@@ -32,72 +192,441 @@ class TestExecutor:
             code_file: Path to the original code file
             mutations: List of mutation dictionaries
             tests: List of test dictionaries
+            source: Already-loaded SourceModel of the code file (optional, read from disk if omitted)
+            first_test_file: Number of the first test file, test_<n>.py; a run
+                to be merged into earlier results starts after their tests
+                (see merge_results), so no earlier file is overwritten
             
         Returns:
             Dictionary with test results
         """
+        if source is None:
+            source = SourceModel(self._read_file(code_file), code_file)
+        
+        self._open_workers(code_file, tests, first_test_file)
+        try:
+            return self._run_tests(code_file, mutations, tests, source)
+        finally:
+            self._close_workers()
+    
+    def _run_tests(self, 
+                   code_file: str, 
+                   mutations: List[Dict[str, Any]], 
+                   tests: List[Dict[str, Any]],
+                   source: SourceModel) -> Dict[str, Any]:
+        """
+        Run all tests against original and mutated code (see run_tests)
+        """
         results = {
-            "original_code": self._read_file(code_file),
+            "original_code": source.text,
+            "source_hash": source.content_hash,
             "total_mutations": len(mutations),
             "total_tests": len(tests),
             "tests_passed_original": 0,
             "tests_detected_mutations": 0,
+            "test_executions": 0,
+            "stillborn_mutations": 0,
+            "equivalent_mutations": 0,
+            "not_covered_mutations": 0,
+            "timeout_mutations": 0,
+            "inferred_mutations": 0,
+            "not_sampled_mutations": 0,
+            "group_executions": 0,
+            "split_stream_runs": 0,
+            "flaky_tests": 0,
             "mutation_detection_rate": 0.0,
             "mutation_results": [],
         }
         
-        # Run tests against the original code first
+        # Compile every mutant first so stillborn and equivalent ones never reach a subprocess
+        triage = MutantTriage(source)
+        statuses = [triage.classify(mutation) for mutation in mutations]
+        
+        schemata_file, schemata_ids = None, set()
+        if self.use_schemata:
+            schemata_file, schemata_ids = self._compile_schemata(code_file, source, mutations, statuses)
+        
+        if self.session:
+            return self._run_session_tests(mutations, tests, source, statuses,
+                                           schemata_file, schemata_ids, results)
+        
+        # Calibrate: run tests against the original code first, a few times
+        # (the first run under line coverage if enabled)
+        calibration = [[] for _ in tests]
+        for run in range(self.calibration_runs):
+            baseline = self._map_workers(
+                lambda test_idx, worker: self._execute_test(
+                    self._test_file(worker, test_idx), worker["code_file"], worker=worker,
+                    coverage_file=self._coverage_file(worker, test_idx) if self.coverage and run == 0 else None
+                ),
+                range(len(tests))
+            )
+            for test_idx, outcome in enumerate(baseline):
+                calibration[test_idx].append(outcome)
+        
+        covered_lines = {}
+        for test_idx, (test_info, outcomes) in enumerate(zip(tests, calibration)):
+            test_info.update(self._calibrate(outcomes))
+            if test_info["flaky"]:
+                results["flaky_tests"] += 1
+            if test_info["passes_original"]:
+                results["tests_passed_original"] += 1
+                if self.coverage:
+                    covered_lines[test_idx] = read_covered_lines(outcomes[0]["coverage_file"])
+        
+        run_state = {
+            "source": source,
+            "statuses": statuses,
+            "schemata_file": schemata_file,
+            "schemata_ids": schemata_ids,
+            # Only tests that passed every calibration run can detect a mutation
+            "passing_tests": [idx for idx, test_info in enumerate(tests) if test_info["passes_original"]],
+            # Line -> passing tests that execute it (None when coverage is off)
+            "line_index": build_line_index(covered_lines) if self.coverage else None,
+            "durations": {idx: test_info["mean_duration"] for idx, test_info in enumerate(tests)},
+            "timeouts": {idx: test_info["timeout"] for idx, test_info in enumerate(tests)},
+            # Kill history key of each test
+            "test_keys": {idx: test_key(test_info) for idx, test_info in enumerate(tests)},
+        }
+        
+        return self._evaluate_mutations(mutations, tests, run_state, results)
+    
+    def _run_session_tests(self,
+                           mutations: List[Dict[str, Any]],
+                           tests: List[Dict[str, Any]],
+                           source: SourceModel,
+                           statuses: List[str],
+                           schemata_file: Optional[str],
+                           schemata_ids: set,
+                           results: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Calibrate and run the tests case by case in sessions (see _run_tests)
+        
+        Every test case of every file is a unit: its calibration runs give it
+        a mean runtime and a flaky flag, only cases that passed every run can
+        kill, and the mutants are then evaluated with one session each.
+        """
+        cases, overhead = self._calibrate_session(tests)
+        
+        covered_lines = {}
         for test_idx, test_info in enumerate(tests):
-            test_file = os.path.join(self.temp_dir, "tests", f"test_{test_idx}.py")
-            with open(test_file, "w", encoding="utf-8") as f:
-                f.write(test_info["code"])
-            
-            # Run the test against the original code
-            original_success = self._run_single_test(test_file, code_file)
-            test_info["passes_original"] = original_success
-            
-            if original_success:
+            file_cases = [case for case, info in cases.items() if info["test"] == test_idx]
+            test_info.update({
+                "cases": file_cases,
+                "passes_original": bool(file_cases) and all(cases[case]["passes_original"] for case in file_cases),
+                "flaky": any(cases[case]["flaky"] for case in file_cases),
+                "mean_duration": sum(cases[case]["mean_duration"] for case in file_cases),
+            })
+            test_info["timeout"] = self._session_timeout(file_cases, cases, overhead)
+            if test_info["flaky"]:
+                results["flaky_tests"] += 1
+            if test_info["passes_original"]:
                 results["tests_passed_original"] += 1
         
-        # Create mutation results
-        for mutation_idx, mutation in enumerate(mutations):
-            # Create the mutated code file
-            mutated_file = os.path.join(self.temp_dir, f"mutated_{mutation_idx}.py")
-            self._create_mutated_file(code_file, mutated_file, mutation)
-            
-            mutation_result = {
-                "mutation_id": mutation_idx,
-                "mutation_description": mutation.get("description", "Unknown mutation"),
-                "line_number": mutation.get("line", 0),
-                "original_code": mutation.get("original_code", ""),
-                "mutated_code": mutation.get("mutated_code", ""),
-                "detected_by_tests": [],
-                "was_detected": False
+        # Only cases that passed every calibration run can detect a mutation
+        passing_cases = [case for case, info in cases.items() if info["passes_original"]]
+        if self.coverage:
+            covered_lines = {case: cases[case]["lines"] for case in passing_cases}
+        
+        results["test_cases"] = [
+            {
+                "case_id": case,
+                "test_id": info["test"],
+                "passes_original": info["passes_original"],
+                "flaky": info["flaky"],
+                "mean_duration": info["mean_duration"],
             }
+            for case, info in cases.items()
+        ]
+        
+        run_state = {
+            "source": source,
+            "statuses": statuses,
+            "schemata_file": schemata_file,
+            "schemata_ids": schemata_ids,
+            "passing_tests": passing_cases,
+            "line_index": build_line_index(covered_lines) if self.coverage else None,
+            "durations": {case: info["mean_duration"] for case, info in cases.items()},
+            "cases": cases,
+            "session_overhead": overhead,
+            # Kill history key of each case: its test's key instead of the file name
+            "test_keys": {
+                case: test_key(tests[info["test"]]) + CASE_SEPARATOR + case.split(CASE_SEPARATOR, 1)[1]
+                for case, info in cases.items()
+            },
+        }
+        
+        return self._evaluate_mutations(mutations, tests, run_state, results)
+    
+    def _evaluate_mutations(self,
+                            mutations: List[Dict[str, Any]],
+                            tests: List[Dict[str, Any]],
+                            run_state: Dict[str, Any],
+                            results: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Evaluate every mutation and summarize the results (see _run_tests)
+        
+        Sampling, grouping, split-stream and dominator reduction are mutually
+        exclusive (checked in __init__); without any of them every mutant is
+        evaluated on its own.
+        """
+        if self.sampling:
+            mutation_results = self._sample_mutations(mutations, run_state, results)
+            return self._summarize(mutations, tests, run_state, results, mutation_results)
+        if self.group_size > 1:
+            mutation_results = self._group_test_mutations(mutations, run_state, results)
+            return self._summarize(mutations, tests, run_state, results, mutation_results)
+        if self.split_stream:
+            mutation_results = self._split_stream_mutations(mutations, run_state, results)
+            return self._summarize(mutations, tests, run_state, results, mutation_results)
+        
+        dominator_of = {}
+        if self.reduce_mutants:
+            reducer = MutantReducer(run_state["source"], mutations, self.previous_results)
+            reducer.restrict([status == VIABLE for status in run_state["statuses"]])
+            dominator_of = reducer.dominator_of
+        
+        # Evaluate every mutation, spread over the worker pool; subsumed mutants
+        # wait for their dominator and are only run if it survived
+        evaluate = lambda mutation_idx, worker: self._evaluate_mutation(mutation_idx, mutations[mutation_idx], run_state, worker)
+        first_pass = [idx for idx in range(len(mutations)) if idx not in dominator_of]
+        mutation_results = [None] * len(mutations)
+        for mutation_idx, mutation_result in zip(first_pass, self._map_workers(evaluate, first_pass)):
+            mutation_results[mutation_idx] = mutation_result
+        
+        second_pass = []
+        for mutation_idx, dominator_idx in sorted(dominator_of.items()):
+            dominator_result = mutation_results[dominator_idx]
+            if dominator_result["was_detected"]:
+                mutation_results[mutation_idx] = self._infer_result(
+                    mutation_idx, mutations[mutation_idx], dominator_result, run_state
+                )
+                results["inferred_mutations"] += 1
+            else:
+                second_pass.append(mutation_idx)
+        for mutation_idx, mutation_result in zip(second_pass, self._map_workers(evaluate, second_pass)):
+            mutation_results[mutation_idx] = mutation_result
+        
+        return self._summarize(mutations, tests, run_state, results, mutation_results)
+    
+    def _sample_mutations(self, mutations: List[Dict[str, Any]], run_state: Dict[str, Any],
+                          results: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Evaluate mutants in sample order until the score is known precisely enough
+        
+        Mutants are evaluated a batch (one per worker) at a time; after each
+        batch the Wilson interval of the detection rate over the killable
+        mutants evaluated so far is updated, and sampling stops once it is at
+        most ci_width percentage points wide. Mutants never reached get the
+        status not_sampled and are left out of the score.
+        
+        Returns:
+            Mutation results, in the order of the mutations
+        """
+        order = MutantSampler(mutations, self.sampling, self.sample_seed).order()
+        mutation_results = [None] * len(mutations)
+        evaluated, killable, killed = 0, 0, 0
+        low, high = 0.0, 1.0
+        
+        while evaluated < len(order):
+            batch = order[evaluated:evaluated + self.workers]
+            batch_results = self._map_workers(
+                lambda mutation_idx, worker: self._evaluate_mutation(mutation_idx, mutations[mutation_idx], run_state, worker),
+                batch
+            )
+            for mutation_idx, mutation_result in zip(batch, batch_results):
+                mutation_results[mutation_idx] = mutation_result
+                if mutation_result["status"] not in (STILLBORN, EQUIVALENT):
+                    killable += 1
+                    killed += mutation_result["was_detected"]
+            evaluated += len(batch)
             
-            # Run each test against this mutation
-            for test_idx, test_info in enumerate(tests):
-                # Only run tests that passed against the original code
-                if not test_info.get("passes_original", False):
-                    continue
-                    
-                test_file = os.path.join(self.temp_dir, "tests", f"test_{test_idx}.py")
-                mutated_success = self._run_single_test(test_file, mutated_file)
-                
-                # If the test fails on the mutation but passed on the original,
-                # it has detected the mutation
-                if not mutated_success:
-                    mutation_result["detected_by_tests"].append(test_idx)
-                    mutation_result["was_detected"] = True
-                    test_info["detected_mutations"] = test_info.get("detected_mutations", []) + [mutation_idx]
+            low, high = wilson_interval(killed, killable, self.confidence)
+            if killable >= MIN_SAMPLE_SIZE and (high - low) * 100 <= self.ci_width:
+                break
+        
+        for mutation_idx in order[evaluated:]:
+            mutation_results[mutation_idx] = self._new_result(mutation_idx, mutations[mutation_idx], NOT_SAMPLED)
+        
+        results["sampling"] = {
+            "strategy": self.sampling,
+            "sample_size": killable,
+            "evaluated_mutations": evaluated,
+            "confidence": self.confidence,
+            "interval": [low * 100, high * 100],
+            "width": (high - low) * 100,
+            "stopped_early": evaluated < len(order),
+        }
+        return mutation_results
+    
+    def _group_test_mutations(self, mutations: List[Dict[str, Any]], run_state: Dict[str, Any],
+                              results: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Evaluate mutants in groups, splitting a group only when it is killed
+        
+        Each group holds at most one mutant per function, so its mutants
+        are independent enough to be applied together. A group that
+        survives all of its tests marks every member survived at the cost
+        of one run; a killed group is bisected until the killed members are
+        found, and those get a regular evaluation. One mutant can mask
+        another inside a group (e.g. an earlier exception), so grouping
+        trades a little accuracy for speed on code with many survivors.
+        
+        Returns:
+            Mutation results, in the order of the mutations
+        """
+        mutation_results = [None] * len(mutations)
+        buckets: Dict[str, List[int]] = {}
+        singles = []
+        for mutation_idx, mutation in enumerate(mutations):
+            groupable = (
+                run_state["statuses"][mutation_idx] == VIABLE
+                and "replacement" in mutation and "col_offset" in mutation
+                and mutation.get("function")
+                and self._select_tests([mutation], run_state)
+            )
+            if groupable:
+                buckets.setdefault(mutation["function"], []).append(mutation_idx)
+            else:
+                singles.append(mutation_idx)
+        
+        # Deal the mutants round-robin over their functions, so no group gets two of one function
+        groups = []
+        while any(buckets.values()):
+            pending = [bucket.pop(0) for bucket in buckets.values() if bucket]
+            groups.extend(pending[start:start + self.group_size] for start in range(0, len(pending), self.group_size))
+        
+        evaluate = lambda mutation_idx, worker: self._evaluate_mutation(mutation_idx, mutations[mutation_idx], run_state, worker)
+        for mutation_idx, mutation_result in zip(singles, self._map_workers(evaluate, singles)):
+            mutation_results[mutation_idx] = mutation_result
+        
+        group_results = self._map_workers(
+            lambda group, worker: self._evaluate_group(group, mutations, run_state, worker), groups
+        )
+        for group_result, probes in group_results:
+            results["group_executions"] += probes
+            results["test_executions"] += probes
+            for mutation_result in group_result:
+                mutation_results[mutation_result["mutation_id"]] = mutation_result
+        
+        results["grouping"] = {
+            "group_size": self.group_size,
+            "groups": len(groups),
+            "grouped_mutations": sum(len(group) for group in groups),
+        }
+        return mutation_results
+    
+    def _evaluate_group(self, group: List[int], mutations: List[Dict[str, Any]],
+                        run_state: Dict[str, Any], worker: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Run the tests once against a group of mutants applied together
+        
+        Args:
+            group: Indices of the mutations in the group
+            mutations: Mutation details
+            run_state: Shared state of the current run
+            worker: Worker slot to run in
+        
+        Returns:
+            (results of the group's mutations, test executions spent on group probes)
+        """
+        if len(group) == 1:
+            return [self._evaluate_mutation(group[0], mutations[group[0]], run_state, worker)], 0
+        
+        members = [mutations[mutation_idx] for mutation_idx in group]
+        probe = self._new_result(group[0], members[0], VIABLE)
+        self._execute_mutant(probe, self._select_tests(members, run_state),
+                             worker["code_file"], None,
+                             {"source": apply_mutations(run_state["source"], members)}, run_state, worker, True)
+        
+        if not probe["was_detected"]:
+            group_results = []
+            for mutation_idx, mutation in zip(group, members):
+                mutation_result = self._new_result(mutation_idx, mutation, "survived")
+                mutation_result["group"] = list(group)
+                group_results.append(mutation_result)
+            return group_results, probe["tests_run"]
+        
+        # Killed: some member is killed, find which by bisection
+        middle = len(group) // 2
+        first, first_probes = self._evaluate_group(group[:middle], mutations, run_state, worker)
+        second, second_probes = self._evaluate_group(group[middle:], mutations, run_state, worker)
+        return first + second, probe["tests_run"] + first_probes + second_probes
+    
+    def _split_stream_mutations(self, mutations: List[Dict[str, Any]], run_state: Dict[str, Any],
+                                results: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Evaluate the mutants with one split-stream run per passing test
+        
+        The viable mutants are compiled into split-stream schemata; every
+        passing test runs once against them and forks a process per mutant
+        whose site it reaches (see split_stream). A mutant no test reaches
+        is not covered. Mutants the schemata cannot hold, and tests whose
+        split-stream run did not finish, fall back to regular runs.
+        
+        Returns:
+            Mutation results, in the order of the mutations
+        """
+        viable = [idx for idx, status in enumerate(run_state["statuses"]) if status == VIABLE]
+        compiled = SchemataCompiler(run_state["source"]).compile(
+            [mutations[idx] for idx in viable], viable, split=True
+        )
+        streamed = set(compiled["mutant_ids"])
+        
+        passing_tests = run_state["passing_tests"]
+        streams = self._map_workers(
+            lambda test_idx, worker: self._run_split_stream(
+                self._test_file(worker, test_idx), worker["code_file"],
+                worker, compiled["code"], run_state["timeouts"][test_idx]
+            ),
+            passing_tests
+        ) if streamed else []
+        results["split_stream_runs"] = len(streams)
+        
+        def evaluate(mutation_idx, worker):
+            mutation = mutations[mutation_idx]
+            if mutation_idx not in streamed:
+                return self._evaluate_mutation(mutation_idx, mutation, run_state, worker)
             
+            mutation_result = self._new_result(mutation_idx, mutation, VIABLE)
+            unfinished = []
+            for test_idx, stream in zip(passing_tests, streams):
+                if stream is None:
+                    unfinished.append(test_idx)
+                elif mutation_idx in stream["mutants"]:
+                    self._record_outcome(mutation_result, test_idx, stream["mutants"][mutation_idx])
+            if unfinished and not (self.first_kill and mutation_result["was_detected"]):
+                code_file = worker["code_file"]
+                self._execute_mutant(mutation_result, unfinished, code_file, None,
+                                     {"source": apply_mutation(run_state["source"], mutation)},
+                                     run_state, worker, self.first_kill)
+            
+            if not mutation_result["tests_run"]:
+                mutation_result["status"] = NOT_COVERED
+                return mutation_result
+            self._finish_result(mutation_result, mutation, run_state)
+            return mutation_result
+        
+        return self._map_workers(evaluate, range(len(mutations)))
+    
+    def _summarize(self,
+                   mutations: List[Dict[str, Any]],
+                   tests: List[Dict[str, Any]],
+                   run_state: Dict[str, Any],
+                   results: Dict[str, Any],
+                   mutation_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Aggregate the mutation results into the run results (see _run_tests)
+        """
+        for mutation_result in mutation_results:
             results["mutation_results"].append(mutation_result)
-            if mutation_result["was_detected"]:
-                results["tests_detected_mutations"] += 1
+            results["test_executions"] += mutation_result["tests_run"]
+            if mutation_result["status"] in (STILLBORN, EQUIVALENT, NOT_COVERED, TIMEOUT, NOT_SAMPLED):
+                results[f"{mutation_result['status']}_mutations"] += 1
         
-        # Calculate detection rate
-        if len(mutations) > 0:
-            results["mutation_detection_rate"] = results["tests_detected_mutations"] / len(mutations) * 100
+        kill_matrix = self._summarize_kills(results)
+        for test_idx, test_info in enumerate(tests):
+            test_info["detected_mutations"] = kill_matrix.killed_by(test_idx).tolist()
         
         # Add test details to the results
         results["test_details"] = []
@@ -105,77 +634,765 @@ class TestExecutor:
             results["test_details"].append({
                 "test_id": test_idx,
                 "name": test_info.get("name", f"Test {test_idx}"),
+                "test_key": test_key(test_info),
                 "passes_original": test_info.get("passes_original", False),
+                "flaky": test_info.get("flaky", False),
+                "mean_duration": test_info.get("mean_duration", 0.0),
+                "timeout": test_info.get("timeout", DEFAULT_TEST_TIMEOUT),
+                "cases": test_info.get("cases", []),
                 "detected_mutations": test_info.get("detected_mutations", []),
                 "detection_count": len(test_info.get("detected_mutations", [])),
             })
         
         return results
     
-    def _create_mutated_file(self, original_file: str, mutated_file: str, mutation: Dict[str, Any]) -> None:
+    def _summarize_kills(self, results: Dict[str, Any]) -> KillMatrix:
+        """
+        Build the kill matrices and the detection rate of run results from their mutation results
+        
+        Returns:
+            The mutant x test kill matrix
+        """
+        # Collect the kill relation in a mutant x test matrix (and mutant x case in session mode)
+        mutation_results = results["mutation_results"]
+        kill_matrix = KillMatrix(len(mutation_results), results["total_tests"])
+        case_matrix = None
+        if "test_cases" in results:
+            case_ids = [case["case_id"] for case in results["test_cases"]]
+            case_matrix = KillMatrix(len(mutation_results), len(case_ids), case_ids)
+        for mutation_idx, mutation_result in enumerate(mutation_results):
+            kill_matrix.record(mutation_idx, mutation_result["detected_by_tests"])
+            if case_matrix is not None:
+                case_matrix.record(mutation_idx, mutation_result["detected_by_cases"])
+        
+        # Calculate detection rate over the mutants that could actually be killed
+        killable = np.array(
+            [result["status"] not in (STILLBORN, EQUIVALENT, NOT_SAMPLED) for result in mutation_results], dtype=bool
+        )
+        line_numbers = [result["line_number"] for result in mutation_results]
+        results["tests_detected_mutations"] = int(kill_matrix.killed().sum())
+        results["mutation_detection_rate"] = kill_matrix.mutation_score(killable)
+        results["kill_matrix"] = kill_matrix.summary(line_numbers, killable)
+        if case_matrix is not None:
+            results["case_kill_matrix"] = case_matrix.summary(line_numbers, killable)
+        return kill_matrix
+    
+    def merge_results(self, results: Dict[str, Any], extra_results: Dict[str, Any],
+                      mutation_indices: List[int]) -> Dict[str, Any]:
+        """
+        Add the results of new tests, run against some of the mutants, to earlier results
+        
+        The new tests are numbered after the earlier ones, their kills are
+        added to the mutants they were run against and the kill matrices,
+        counters and detection rate are rebuilt, so the merged results read
+        as one run of both suites without running the earlier tests again.
+        The new tests must have been run with first_test_file set to the
+        earlier test count, so their files (and the case ids naming them)
+        already carry the merged numbers and stay next to the earlier ones.
+        
+        Args:
+            results: Results of a run_tests call (updated in place)
+            extra_results: Results of a run_tests call with the new tests
+            mutation_indices: Index in results of each mutation in extra_results
+        
+        Returns:
+            The merged results
+        """
+        offset = results["total_tests"]
+        
+        for mutation_idx, extra in zip(mutation_indices, extra_results["mutation_results"]):
+            mutation_result = results["mutation_results"][mutation_idx]
+            mutation_result["tests_run"] += extra["tests_run"]
+            if extra["status"] not in ("killed", "survived", TIMEOUT):
+                # Not executed against the new tests, the earlier verdict stands
+                continue
+            mutation_result["detected_by_tests"] += [offset + test_idx for test_idx in extra["detected_by_tests"]]
+            mutation_result["timed_out_tests"] += [offset + test_idx for test_idx in extra["timed_out_tests"]]
+            mutation_result["detected_by_cases"] += extra["detected_by_cases"]
+            if extra["was_detected"] and not mutation_result["was_detected"]:
+                mutation_result["killed_by"] = offset + extra["killed_by"]
+            mutation_result["was_detected"] = mutation_result["was_detected"] or extra["was_detected"]
+            if mutation_result["was_detected"]:
+                timed_out = len(mutation_result["timed_out_tests"]) == len(
+                    mutation_result["detected_by_cases"] or mutation_result["detected_by_tests"]
+                )
+                mutation_result["status"] = TIMEOUT if timed_out else "killed"
+            else:
+                # A mutant not covered before is covered by a surviving new test
+                mutation_result["status"] = "survived"
+        
+        for key in ("total_tests", "tests_passed_original", "test_executions", "group_executions",
+                    "split_stream_runs", "flaky_tests"):
+            results[key] += extra_results[key]
+        for status in (NOT_COVERED, TIMEOUT):
+            results[f"{status}_mutations"] = sum(
+                mutation_result["status"] == status for mutation_result in results["mutation_results"]
+            )
+        if "test_cases" in results:
+            results["test_cases"] += [
+                dict(case, test_id=offset + case["test_id"])
+                for case in extra_results.get("test_cases", [])
+            ]
+        
+        kill_matrix = self._summarize_kills(results)
+        results["test_details"] += [
+            dict(test_detail, test_id=offset + test_detail["test_id"])
+            for test_detail in extra_results["test_details"]
+        ]
+        for test_detail in results["test_details"]:
+            test_detail["detected_mutations"] = kill_matrix.killed_by(test_detail["test_id"]).tolist()
+            test_detail["detection_count"] = len(test_detail["detected_mutations"])
+        
+        if "sampling" in results:
+            sampled = [
+                mutation_result for mutation_result in results["mutation_results"]
+                if mutation_result["status"] not in (STILLBORN, EQUIVALENT, NOT_SAMPLED)
+            ]
+            low, high = wilson_interval(sum(mutation_result["was_detected"] for mutation_result in sampled),
+                                        len(sampled), self.confidence)
+            results["sampling"].update({"interval": [low * 100, high * 100], "width": (high - low) * 100})
+        return results
+    
+    def _evaluate_mutation(self, mutation_idx: int, mutation: Dict[str, Any],
+                           run_state: Dict[str, Any], worker: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Run the passing tests against one mutation
+        
+        Args:
+            mutation_idx: Index of the mutation
+            mutation: Mutation details
+            run_state: Shared state of the current run (source, triage statuses, schemata,
+                passing tests, or passing test cases in session mode)
+            worker: Worker slot to run in
+            
+        Returns:
+            Mutation result dictionary
+        """
+        mutation_result = self._new_result(mutation_idx, mutation, run_state["statuses"][mutation_idx])
+        
+        if mutation_result["status"] != VIABLE:
+            return mutation_result
+        
+        test_indices = self._select_tests([mutation], run_state)
+        if run_state["line_index"] is not None and not test_indices:
+            # No test reaches the mutant, so it survives without running anything
+            mutation_result["status"] = NOT_COVERED
+            return mutation_result
+        if self.prioritize:
+            test_indices = self.kill_history.order(mutation, test_indices, run_state["durations"],
+                                                   run_state["test_keys"])
+        
+        # Serve the mutant from memory under the original module name
+        if mutation_idx in run_state["schemata_ids"]:
+            # The compiled schemata module already holds this mutant, only select it
+            env, mutant = {ACTIVE_MUTANT_ENV: str(mutation_idx)}, {"compiled": run_state["schemata_file"]}
+        else:
+            env, mutant = None, {"source": apply_mutation(run_state["source"], mutation)}
+        
+        self._execute_mutant(mutation_result, test_indices, worker["code_file"], env, mutant,
+                             run_state, worker, self.first_kill)
+        self._finish_result(mutation_result, mutation, run_state)
+        return mutation_result
+    
+    def _finish_result(self, mutation_result: Dict[str, Any], mutation: Dict[str, Any],
+                       run_state: Dict[str, Any]) -> None:
+        """Set the verdict of an executed mutant and remember its killing tests (by key)"""
+        if not mutation_result["was_detected"]:
+            mutation_result["status"] = "survived"
+        elif len(mutation_result["timed_out_tests"]) == len(mutation_result["detected_by_cases"] or mutation_result["detected_by_tests"]):
+            # Detected, but only because the mutant ran out of time (e.g. an endless loop)
+            mutation_result["status"] = TIMEOUT
+        else:
+            mutation_result["status"] = "killed"
+        killing_tests = mutation_result["detected_by_cases"] or mutation_result["detected_by_tests"]
+        self.kill_history.record(mutation, [run_state["test_keys"][test] for test in killing_tests])
+    
+    def _new_result(self, mutation_idx: int, mutation: Dict[str, Any], status: str) -> Dict[str, Any]:
+        """Empty result dictionary of a mutation"""
+        return {
+            "mutation_id": mutation_idx,
+            "mutation_description": mutation.get("mutation_description", mutation.get("description", "Unknown mutation")),
+            "line_number": mutation.get("line_number", mutation.get("line", 0)),
+            "original_code": mutation.get("original_code", ""),
+            "mutated_code": mutation.get("mutated_code", ""),
+            "detected_by_tests": [],
+            "timed_out_tests": [],
+            "detected_by_cases": [],
+            "killed_by": None,
+            "tests_run": 0,
+            "was_detected": False,
+            "status": status,
+            "mutant_key": mutant_key(mutation),
+            "inferred_from": None,
+            "group": None,
+        }
+    
+    def _select_tests(self, mutations: List[Dict[str, Any]], run_state: Dict[str, Any]) -> List[Any]:
+        """
+        Passing tests (or cases) to run against some mutations, in run order
+        
+        With coverage only the tests executing at least one of the mutated
+        statements are selected.
+        """
+        test_indices = run_state["passing_tests"]
+        if run_state["line_index"] is not None:
+            covering = set()
+            for mutation in mutations:
+                covering.update(self._covering_tests(run_state["source"], mutation, run_state["line_index"]))
+            test_indices = [test_idx for test_idx in test_indices if test_idx in covering]
+        return test_indices
+    
+    def _execute_mutant(self, mutation_result: Dict[str, Any], test_indices: List[Any], code_file: str,
+                        env: Optional[Dict[str, str]], mutant: Optional[Dict[str, str]],
+                        run_state: Dict[str, Any], worker: Dict[str, Any], stop_on_kill: bool) -> None:
+        """
+        Run tests against a mutant and record the kills in its result
+        
+        Args:
+            mutation_result: Mutation result dictionary to fill in
+            test_indices: Tests (or cases in session mode) to run, in run order
+            code_file: Code file the tests import
+            env: Extra environment variables for the tests
+            mutant: Mutant to serve in place of code_file, {"source": mutated
+                source} or {"compiled": compiled schemata file} (optional)
+            run_state: Shared state of the current run
+            worker: Worker slot to run in
+            stop_on_kill: Stop at the first test that kills the mutant
+        """
+        if self.session:
+            self._run_mutant_session(mutation_result, test_indices, code_file, env, mutant,
+                                     run_state, worker, stop_on_kill)
+            return
+        
+        # Run each (covering) test against this mutation
+        for test_idx in test_indices:
+            outcome = self._execute_test(self._test_file(worker, test_idx), code_file, env, worker,
+                                         timeout=run_state["timeouts"][test_idx], mutant=mutant)
+            self._record_outcome(mutation_result, test_idx, outcome)
+            if stop_on_kill and mutation_result["was_detected"]:
+                break
+    
+    def _record_outcome(self, mutation_result: Dict[str, Any], test_idx: int, outcome: Dict[str, Any]) -> None:
+        """Count a test run against a mutant and record it if the test killed the mutant"""
+        mutation_result["tests_run"] += 1
+        
+        # If the test fails on the mutation but passed on the original,
+        # it has detected the mutation
+        if not outcome["passed"]:
+            mutation_result["detected_by_tests"].append(test_idx)
+            if outcome["timed_out"]:
+                mutation_result["timed_out_tests"].append(test_idx)
+            if not mutation_result["was_detected"]:
+                mutation_result["killed_by"] = test_idx
+            mutation_result["was_detected"] = True
+    
+    def _infer_result(self, mutation_idx: int, mutation: Dict[str, Any],
+                      dominator_result: Dict[str, Any], run_state: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Build the result of a subsumed mutant from its killed dominator
+        
+        Every test that kills the dominator kills the subsumed mutant, so it
+        gets the dominator's verdict and killing tests without being run.
+        
+        Args:
+            mutation_idx: Index of the subsumed mutation
+            mutation: Mutation details
+            dominator_result: Result of the dominator mutation
+            run_state: Shared state of the current run
+            
+        Returns:
+            Mutation result dictionary
+        """
+        mutation_result = self._new_result(mutation_idx, mutation, dominator_result["status"])
+        mutation_result.update({
+            "detected_by_tests": list(dominator_result["detected_by_tests"]),
+            "timed_out_tests": list(dominator_result["timed_out_tests"]),
+            "detected_by_cases": list(dominator_result["detected_by_cases"]),
+            "killed_by": dominator_result["killed_by"],
+            "was_detected": True,
+            "inferred_from": dominator_result["mutation_id"],
+        })
+        return mutation_result
+    
+    def _run_mutant_session(self, mutation_result: Dict[str, Any], cases: List[str], code_file: str,
+                            env: Optional[Dict[str, str]], mutant: Optional[Dict[str, str]],
+                            run_state: Dict[str, Any], worker: Dict[str, Any], stop_on_kill: bool) -> None:
+        """
+        Run the selected test cases against one mutation in a single session
+        
+        A case kills the mutant when it fails or when its file no longer
+        collects. When the session times out (or dies without reporting a
+        failure), the first case that did not report is the one that hung.
+        
+        Args:
+            mutation_result: Mutation result dictionary to fill in
+            cases: Case ids to run, in run order
+            code_file: Code file the tests import
+            env: Extra environment variables for the session
+            mutant: Mutant to serve in place of code_file (see _execute_mutant, optional)
+            run_state: Shared state of the current run
+            worker: Worker slot to run in
+            stop_on_kill: Stop at the first failing case
+        """
+        timeout = self._session_timeout(cases, run_state["cases"], run_state["session_overhead"])
+        outcome, records = self._execute_session(worker, cases, code_file, env, timeout,
+                                                 mutant=mutant, stop_on_kill=stop_on_kill)
+        
+        selected = set(cases)
+        reported, broken_files = {}, set()
+        for record in records:
+            if "case" not in record:
+                continue
+            if record["case"] in selected:
+                reported[record["case"]] = record["passed"]
+            elif not record["passed"]:
+                broken_files.add(record["file"])
+        
+        blame_unreported = outcome["timed_out"] or (
+            not outcome["passed"] and all(reported.values()) and not broken_files
+        )
+        for case in cases:
+            timed_out = False
+            if case in reported:
+                mutation_result["tests_run"] += 1
+                killed = not reported[case]
+            elif case_file(case) in broken_files:
+                killed = True
+            elif blame_unreported:
+                mutation_result["tests_run"] += 1
+                killed, timed_out, blame_unreported = True, outcome["timed_out"], False
+            else:
+                continue
+            
+            if killed:
+                test_idx = run_state["cases"][case]["test"]
+                mutation_result["detected_by_cases"].append(case)
+                if test_idx not in mutation_result["detected_by_tests"]:
+                    mutation_result["detected_by_tests"].append(test_idx)
+                if timed_out:
+                    mutation_result["timed_out_tests"].append(test_idx)
+                if not mutation_result["was_detected"]:
+                    mutation_result["killed_by"] = test_idx
+                mutation_result["was_detected"] = True
+    
+    def _calibrate_session(self, tests: List[Dict[str, Any]]) -> Tuple[Dict[str, Dict[str, Any]], Tuple[float, float]]:
+        """
+        Run the whole suite against the original code in calibration sessions
+        
+        Args:
+            tests: List of test dictionaries
+            
+        Returns:
+            Case id -> {"test", "passes_original", "flaky", "mean_duration",
+            "duration_stdev", "lines"} in collection order, and the mean and
+            standard deviation of the per-session overhead (time outside cases)
+        """
+        test_ids = {test_file: test_idx for test_idx, test_file in enumerate(self._workers[0]["test_files"])}
+        timeout = DEFAULT_TEST_TIMEOUT * max(1, len(tests))
+        
+        runs = []
+        for run in range(self.calibration_runs):
+            runs.append(self._map_workers(
+                lambda _, worker: self._execute_session(
+                    worker, None, worker["code_file"], None, timeout,
+                    coverage_target=worker["code_file"] if self.coverage and run == 0 else None
+                ),
+                range(1)
+            )[0])
+        
+        cases: Dict[str, Dict[str, Any]] = {}
+        setup_lines = set()
+        overheads = []
+        for run, (outcome, records) in enumerate(runs):
+            case_time = 0.0
+            for record in records:
+                if "setup_lines" in record:
+                    setup_lines.update(record["setup_lines"])
+                    continue
+                if record["file"] not in test_ids:
+                    continue
+                info = cases.setdefault(record["case"], {
+                    "test": test_ids[record["file"]], "outcomes": [], "durations": [], "lines": set(),
+                })
+                info["outcomes"].append(record["passed"])
+                info["durations"].append(record["duration"])
+                info["lines"].update(record.get("lines", ()))
+                case_time += record["duration"]
+            overheads.append(max(0.0, outcome["duration"] - case_time))
+        
+        for info in cases.values():
+            outcomes, durations = info.pop("outcomes"), info.pop("durations")
+            # A case missing from a run (the session timed out) did not pass in that run
+            info["passes_original"] = len(outcomes) == len(runs) and all(outcomes)
+            info["flaky"] = len(set(outcomes) | ({False} if len(outcomes) < len(runs) else set())) > 1
+            info["mean_duration"] = statistics.mean(durations)
+            info["duration_stdev"] = statistics.pstdev(durations)
+            # Lines run while importing or collecting can affect every case
+            info["lines"] |= setup_lines
+        
+        return cases, (statistics.mean(overheads), statistics.pstdev(overheads))
+    
+    def _session_timeout(self, cases: List[str], case_info: Dict[str, Dict[str, Any]],
+                         overhead: Tuple[float, float]) -> float:
+        """Timeout of a session running some cases, from their calibration runtimes"""
+        mean = overhead[0] + sum(case_info[case]["mean_duration"] for case in cases)
+        stdev = overhead[1] + sum(case_info[case]["duration_stdev"] for case in cases)
+        return max(MIN_TEST_TIMEOUT, TIMEOUT_FACTOR * mean + TIMEOUT_DEVIATIONS * stdev + TIMEOUT_MARGIN)
+    
+    def _calibrate(self, outcomes: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
-        Create a file with the mutated code
+        Summarize the calibration runs of one test
         
         Args:
-            original_file: Path to the original code file
-            mutated_file: Path where the mutated file should be created
-            mutation: Dictionary with mutation details
+            outcomes: Results of the test's runs against the original code
+            
+        Returns:
+            Dictionary with "passes_original", "flaky", "mean_duration",
+            "duration_stdev" and the "timeout" to use against mutants
+        """
+        durations = [outcome["duration"] for outcome in outcomes]
+        mean = statistics.mean(durations)
+        stdev = statistics.pstdev(durations)
+        return {
+            "passes_original": all(outcome["passed"] for outcome in outcomes),
+            "flaky": len({outcome["passed"] for outcome in outcomes}) > 1,
+            "mean_duration": mean,
+            "duration_stdev": stdev,
+            "timeout": max(MIN_TEST_TIMEOUT, TIMEOUT_FACTOR * mean + TIMEOUT_DEVIATIONS * stdev + TIMEOUT_MARGIN),
+        }
+    
+    def _covering_tests(self, source: SourceModel, mutation: Dict[str, Any],
+                        line_index: Dict[int, List[int]]) -> List[int]:
         """
-        with open(original_file, "r", encoding="utf-8") as f:
-            original_code = f.read()
+        Find the passing tests that execute the statement a mutation changes
         
-        # Check if we have a specific mutation to apply
-        if "line" in mutation and "original_code" in mutation and "mutated_code" in mutation:
-            lines = original_code.splitlines()
-            line_index = mutation["line"] - 1  # Convert to 0-based indexing
+        The whole statement counts, from its first line to the end of the
+        mutated span, because the tracer reports a multi-line statement on
+        the line it starts at.
+        
+        Args:
+            source: Source model of the original code
+            mutation: Mutation details
+            line_index: Line -> passing tests that execute it
             
-            if 0 <= line_index < len(lines):
-                original_line = lines[line_index]
-                mutated_line = original_line.replace(mutation["original_code"], mutation["mutated_code"])
-                lines[line_index] = mutated_line
-                
-                with open(mutated_file, "w", encoding="utf-8") as f:
-                    f.write("\n".join(lines))
-                return
+        Returns:
+            Sorted test indices
+        """
+        line = mutation.get("line_number", mutation.get("line", 0))
+        end_line = mutation.get("end_line_number", line)
+        try:
+            first_line = source.statement_starts[line - 1] or line
+        except (SyntaxError, IndexError):
+            first_line = line
         
-        # If we couldn't apply the specific mutation, just copy the original
-        with open(mutated_file, "w", encoding="utf-8") as f:
-            f.write(original_code)
+        tests = set()
+        for covered_line in range(min(first_line, line), end_line + 1):
+            tests.update(line_index.get(covered_line, ()))
+        return sorted(tests)
     
-    def _run_single_test(self, test_file: str, code_file: str) -> bool:
+    def _open_workers(self, code_file: str, tests: List[Dict[str, Any]], first_test_file: int = 0) -> None:
+        """
+        Prepare one isolated working directory (and fork server) per worker
+        
+        Each worker directory holds its own copy of the test files and the
+        outputs of its runs, so parallel jobs never touch the same file. With
+        a single worker the temp directory is used. Mutants are served from
+        memory, so every worker imports the original code file in place,
+        next to the modules it imports.
+        
+        Args:
+            code_file: Path to the original code file
+            tests: List of test dictionaries
+            first_test_file: Number of the first test file (see run_tests)
+        """
+        test_files = [f"test_{first_test_file + test_idx}.py" for test_idx in range(len(tests))]
+        self._workers = []
+        self._idle_workers = queue.Queue()
+        
+        for worker_idx in range(self.workers):
+            if self.workers == 1:
+                worker_dir = self.temp_dir
+            else:
+                worker_dir = os.path.join(self.temp_dir, "workers", f"worker_{worker_idx}")
+                os.makedirs(os.path.join(worker_dir, "tests"), exist_ok=True)
+            
+            if self.coverage:
+                os.makedirs(os.path.join(worker_dir, "coverage"), exist_ok=True)
+            for test_file, test_info in zip(test_files, tests):
+                with open(os.path.join(worker_dir, "tests", test_file), "w", encoding="utf-8") as f:
+                    f.write(test_info["code"])
+            
+            worker = {
+                "dir": worker_dir,
+                "code_file": os.path.abspath(code_file),
+                # Test files of this run (earlier runs may have left more in the directory)
+                "test_files": test_files,
+                "fork_server": None,
+            }
+            if self.backend == "fork":
+                worker["fork_server"] = ForkServer()
+                worker["fork_server"].start()
+            
+            self._workers.append(worker)
+            self._idle_workers.put(worker)
+    
+    def _close_workers(self) -> None:
+        """Stop the fork servers of all workers"""
+        for worker in self._workers:
+            if worker["fork_server"] is not None:
+                worker["fork_server"].close()
+        self._workers = []
+    
+    def _map_workers(self, function: Callable[[Any, Dict[str, Any]], Any], items: Iterable) -> List[Any]:
+        """
+        Apply function(item, worker) to every item on the worker pool
+        
+        Each call holds a worker slot for its whole duration, so at most
+        `workers` jobs run at once and no two jobs share a directory.
+        
+        Args:
+            function: Job to run
+            items: Job inputs
+            
+        Returns:
+            Job results, in the order of the items
+        """
+        def run(item):
+            worker = self._idle_workers.get()
+            try:
+                return function(item, worker)
+            finally:
+                self._idle_workers.put(worker)
+        
+        if self.workers == 1:
+            return [run(item) for item in items]
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            return list(pool.map(run, items))
+    
+    def _test_file(self, worker: Dict[str, Any], test_idx: int) -> str:
+        """Path of a test file in a worker directory"""
+        return os.path.join(worker["dir"], "tests", worker["test_files"][test_idx])
+    
+    def _coverage_file(self, worker: Dict[str, Any], test_idx: int) -> str:
+        """Path of the line coverage of a test in a worker directory"""
+        return os.path.join(worker["dir"], "coverage", f"test_{test_idx}.json")
+    
+    def _compile_schemata(self, code_file: str, source: SourceModel, mutations: List[Dict[str, Any]],
+                          statuses: List[str]) -> Tuple[Optional[str], set]:
+        """
+        Compile the mutant-schemata module for all viable mutations
+        
+        The module is compiled to a code object once per run and saved in
+        the temp directory; test processes (or the fork servers, before
+        forking) load that code object and only select their mutant. It is
+        served from memory under the original module name (like a single
+        mutant), so it is imported from the directory of the code under
+        test and its sibling modules stay importable.
+        
+        Args:
+            code_file: Path to the original code file
+            source: Source model of the original code file
+            mutations: List of mutation dictionaries
+            statuses: Triage status of each mutation
+            
+        Returns:
+            File of the compiled schemata module (None if it holds no mutant)
+            and the set of mutation indices it contains
+        """
+        viable = [idx for idx, status in enumerate(statuses) if status == VIABLE]
+        schemata = SchemataCompiler(source).compile([mutations[idx] for idx in viable], viable)
+        if not schemata["mutant_ids"]:
+            return None, set()
+        
+        compiled_file = os.path.join(self.temp_dir, SCHEMATA_FILE)
+        write_compiled(compiled_file, schemata["code"], os.path.abspath(code_file))
+        return compiled_file, set(schemata["mutant_ids"])
+    
+    def _run_single_test(self, test_file: str, code_file: str, env_overrides: Optional[Dict[str, str]] = None,
+                         timeout: float = DEFAULT_TEST_TIMEOUT) -> bool:
         """
         Run a single test against a code file
         
         Args:
             test_file: Path to the test file
             code_file: Path to the code file to test
+            env_overrides: Extra environment variables for the test process
+            timeout: Seconds before the test is killed
             
         Returns:
             True if the test passes, False otherwise
         """
+        return self._execute_test(test_file, code_file, env_overrides, timeout=timeout)["passed"]
+    
+    def _execute_test(self, test_file: str, code_file: str,
+                      env_overrides: Optional[Dict[str, str]] = None,
+                      worker: Optional[Dict[str, Any]] = None,
+                      coverage_file: Optional[str] = None,
+                      timeout: float = DEFAULT_TEST_TIMEOUT,
+                      mutant: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """
+        Run a single test against a code file with the configured backend
+        
+        Args:
+            test_file: Path to the test file
+            code_file: Path to the code file to test
+            env_overrides: Extra environment variables for the test process
+            worker: Worker slot to run in (its directory is the working directory)
+            coverage_file: Record the lines of code_file the test executes into this file (optional)
+            timeout: Seconds before the test is killed
+            mutant: Mutant to import in place of code_file (see _execute_mutant);
+                mutated source is handed to the test process and never
+                written to disk (optional)
+            
+        Returns:
+            Dictionary with "passed", "timed_out", "duration" (seconds) and "coverage_file"
+        """
         # Get the directory of the code file
         code_dir = os.path.dirname(code_file)
+        cwd = worker["dir"] if worker else None
+        
+        if worker and worker["fork_server"] is not None:
+            coverage = {"target": code_file, "output": coverage_file} if coverage_file else None
+            mutant = dict(mutant, code_file=code_file) if mutant is not None else None
+            outcome = worker["fork_server"].run_test(test_file, code_dir, env_overrides, timeout, cwd, coverage, mutant)
+            outcome["coverage_file"] = coverage_file
+            return outcome
         
+        command, input_data = [sys.executable, test_file], None
+        if coverage_file:
+            command = [sys.executable, LINE_COVERAGE_SCRIPT, code_file, coverage_file, test_file]
+        elif mutant is not None and mutant.get("compiled"):
+            command = [sys.executable, MUTANT_LOADER_SCRIPT, code_file, test_file, mutant["compiled"]]
+        elif mutant is not None:
+            command = [sys.executable, MUTANT_LOADER_SCRIPT, code_file, test_file]
+            input_data = mutant["source"].encode("utf-8")
+        
+        outcome = self._run_subprocess(command, code_dir, env_overrides, cwd, timeout, test_file, input_data)
+        outcome["coverage_file"] = coverage_file
+        return outcome
+    
+    def _run_split_stream(self, test_file: str, code_file: str, worker: Dict[str, Any],
+                          schemata_source: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        Run a single test split-stream against schemata (see split_stream.run_split)
+        
+        Args:
+            test_file: Path to the test file
+            code_file: Path to the original code file
+            worker: Worker slot to run in
+            schemata_source: Split-stream schemata to serve in place of code_file
+            timeout: Seconds each mutant process may run
+        
+        Returns:
+            {"passed", "mutants": {mutation index: outcome}} for the mutants
+            the test reached, or None if the run did not finish
+        """
+        output_file = os.path.join(worker["dir"], "split_stream.json")
+        if os.path.exists(output_file):
+            os.remove(output_file)
+        
+        code_dir = os.path.dirname(code_file)
+        # The main stream waits for its last mutant process, which may start near its own end
+        run_timeout = 2 * timeout + TIMEOUT_MARGIN
+        if worker["fork_server"] is not None:
+            split = {"code_file": code_file, "source": schemata_source, "output": output_file, "timeout": timeout}
+            worker["fork_server"].run_split(test_file, code_dir, split, run_timeout, worker["dir"])
+        else:
+            self._run_subprocess([sys.executable, SPLIT_STREAM_SCRIPT, code_file, test_file, output_file, str(timeout)],
+                                 code_dir, None, worker["dir"], run_timeout, test_file,
+                                 schemata_source.encode("utf-8"))
+        return read_split(output_file)
+    
+    def _execute_session(self, worker: Dict[str, Any], cases: Optional[List[str]], code_file: str,
+                         env_overrides: Optional[Dict[str, str]], timeout: float,
+                         mutant: Optional[Dict[str, str]] = None, coverage_target: Optional[str] = None,
+                         stop_on_kill: bool = False) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """
+        Run test cases in one session (see test_session.run_session) with the configured backend
+        
+        Args:
+            worker: Worker slot to run in
+            cases: Case ids to run, in run order (None runs every test file of the run)
+            code_file: Path to the code file to test
+            env_overrides: Extra environment variables for the session
+            timeout: Seconds before the session is killed
+            mutant: Mutant to import in place of code_file (see _execute_mutant, optional)
+            coverage_target: Record the lines of this file each case executes (optional)
+            stop_on_kill: Stop at the first failing case
+            
+        Returns:
+            The process outcome ("passed", "timed_out", "duration") and the
+            records the session wrote
+        """
+        if cases is None:
+            test_files = worker["test_files"]
+        else:
+            test_files = list(dict.fromkeys(case_file(case) for case in cases))
+        
+        output_file = os.path.join(worker["dir"], "session.jsonl")
+        if os.path.exists(output_file):
+            os.remove(output_file)
+        
+        config = {
+            "test_files": [os.path.join(worker["dir"], "tests", test_file) for test_file in test_files],
+            "output": output_file,
+            "cases": cases,
+            "stop_on_kill": stop_on_kill,
+            "coverage_target": coverage_target,
+            "mutant": dict(mutant, code_file=code_file) if mutant is not None else None,
+        }
+        code_dir = os.path.dirname(code_file)
+        
+        if worker["fork_server"] is not None:
+            outcome = worker["fork_server"].run_session(config, code_dir, env_overrides, timeout, worker["dir"])
+        else:
+            outcome = self._run_subprocess([sys.executable, TEST_SESSION_SCRIPT], code_dir, env_overrides,
+                                           worker["dir"], timeout, "session", json.dumps(config).encode("utf-8"))
+        return outcome, read_session(output_file)
+    
+    def _run_subprocess(self, command: List[str], code_dir: str, env_overrides: Optional[Dict[str, str]],
+                        cwd: Optional[str], timeout: float, label: str,
+                        input_data: Optional[bytes] = None) -> Dict[str, Any]:
+        """
+        Run a test process with the code directory on its path
+        
+        Args:
+            command: Command line to run
+            code_dir: Directory of the code under test (put first on PYTHONPATH)
+            env_overrides: Extra environment variables for the process
+            cwd: Working directory (optional)
+            timeout: Seconds before the process is killed
+            label: What is being run, for log messages
+            input_data: Bytes to send to the process's stdin (optional)
+            
+        Returns:
+            Dictionary with "passed", "timed_out" and "duration" (seconds)
+        """
         # Create environment with path set to include the code directory
         env = os.environ.copy()
-        env["PYTHONPATH"] = f"{code_dir}:{env.get('PYTHONPATH', '')}"
+        env["PYTHONPATH"] = f"{code_dir}{os.pathsep}{env.get('PYTHONPATH', '')}"
+        env.update(env_overrides or {})
         
+        start = time.perf_counter()
         try:
-            # Try to run the test with unittest
             result = subprocess.run(
-                [sys.executable, test_file],
+                command,
                 env=env,
+                cwd=cwd,
+                input=input_data,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
-                timeout=5  # Prevent infinite loops
+                timeout=timeout  # Prevent infinite loops
             )
-            return result.returncode == 0
+            passed, timed_out = result.returncode == 0, False
         except subprocess.TimeoutExpired:
-            print(f"Test timed out: {test_file}")
-            return False
+            print(f"Test timed out: {label}")
+            passed, timed_out = False, True
         except Exception as e:
-            print(f"Error running test {test_file}: {e}")
-            return False
+            print(f"Error running test {label}: {e}")
+            passed, timed_out = False, False
+        
+        return {"passed": passed, "timed_out": timed_out, "duration": time.perf_counter() - start}
     
     def _read_file(self, file_path: str) -> str:
         """
@@ -1,21 +1,195 @@
 import os
+import re
+import ast
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import google.generativeai as genai
-from typing import Optional, Dict, Any
+from google.api_core import exceptions as api_exceptions
+from typing import Optional, Dict, Any, List, Tuple
+
+from source_model import SourceModel
+from test_cache import TestCache, cache_key
+from prompt_context import ContextSlicer, compact_diff
+
+# Gemini model that writes the tests
+MODEL_NAME = "gemini-pro"
+
+# Version of the prompt template; bump it when _create_prompt changes so
+# cached tests generated from the old prompt are no longer used
+PROMPT_VERSION = 2
+
+# Version of the batched prompt template (_create_batch_prompt)
+BATCH_PROMPT_VERSION = 2
+
+# Added to the mutation description when earlier generated tests did not detect the mutant
+RETRY_NOTE = (
+    " (tests generated earlier did not detect this mutant: choose different inputs that "
+    "reach the changed code and make its result observable)"
+)
+
+# Heading of the code slice in prompts (see ContextSlicer)
+CONTEXT_HEADING = (
+    "Relevant part of the original code (the function under test and the module-level "
+    "definitions it uses; `# ...` marks omitted code):"
+)
+
+# Mutants of one function sent in a single batched prompt
+MAX_BATCH_MUTANTS = 8
+
+# Test method the batched prompt asks for per mutant: test_mutant_<position>[_suffix]
+BATCH_METHOD_PATTERN = re.compile(r"test_mutant_(\d+)(?:_\w*)?$")
+
+# Gemini calls in flight at once in generate_tests_batch
+DEFAULT_CONCURRENCY = 4
+
+# Sustained Gemini requests per second, and how many may be sent in a burst
+DEFAULT_REQUESTS_PER_SECOND = 1.0
+DEFAULT_BURST = 4
+
+# Retries of a call that failed with a transient API error, and the backoff
+# before retry n: min(BACKOFF_MAX, BACKOFF_BASE * 2 ** n) seconds plus jitter
+MAX_RETRIES = 3
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 30.0
+
+# API errors worth retrying: rate limiting, overload and timeouts
+TRANSIENT_ERRORS = (
+    api_exceptions.ResourceExhausted,
+    api_exceptions.ServiceUnavailable,
+    api_exceptions.DeadlineExceeded,
+    api_exceptions.InternalServerError,
+)
+
+
+class TokenBucket:
+    """
+    Thread-safe token-bucket rate limiter
+    
+    Tokens are added at a fixed rate up to the bucket capacity; every
+    request takes one token and waits until one is available, so bursts of
+    up to `capacity` requests go out at once and the sustained rate never
+    exceeds `rate` requests per second.
+    """
+    
+    def __init__(self, rate: float, capacity: int):
+        """
+        Initialize a full bucket
+        
+        Args:
+            rate: Tokens added per second (must be positive)
+            capacity: Maximum number of stored tokens (at least 1)
+        """
+        if not rate > 0:
+            raise ValueError(f"Request rate must be positive, got {rate}")
+        if capacity < 1:
+            raise ValueError(f"Burst size must be at least 1, got {capacity}")
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self) -> None:
+        """Take one token, waiting for it if the bucket is empty"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def split_test_module(test_code: str, count: int) -> Dict[int, str]:
+    """
+    Split a module with test_mutant_<k> methods into one test module per mutant
+    
+    Each module keeps everything of the original module (imports, helpers,
+    setUp) except the test methods that belong to other mutants.
+    
+    Args:
+        test_code: Test module generated for a batched prompt
+        count: Number of mutants in the prompt
+    
+    Returns:
+        Mutant position -> test module, for the mutants that got a test method
+    """
+    try:
+        tree = ast.parse(test_code)
+    except SyntaxError:
+        return {}
+    
+    # Line ranges (decorators included) of every test method, by mutant position
+    classes = []
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.ClassDef):
+            continue
+        methods = []
+        for member in node.body:
+            if isinstance(member, (ast.FunctionDef, ast.AsyncFunctionDef)) and member.name.startswith("test"):
+                match = BATCH_METHOD_PATTERN.match(member.name)
+                methods.append((int(match.group(1)) if match else None, _line_span(member)))
+        if methods:
+            # A class left with no members at all is dropped as a whole
+            classes.append((_line_span(node), methods, len(methods) == len(node.body)))
+    
+    lines = test_code.splitlines(keepends=True)
+    modules = {}
+    for position in range(count):
+        if not any(owner == position for _, methods, _ in classes for owner, _ in methods):
+            continue
+        dropped = set()
+        for class_span, methods, only_tests in classes:
+            if only_tests and all(owner != position for owner, _ in methods):
+                dropped.update(class_span)
+            else:
+                for owner, span in methods:
+                    if owner != position:
+                        dropped.update(span)
+        modules[position] = "".join(line for number, line in enumerate(lines, 1) if number not in dropped)
+    return modules
+
+
+def _prompt_version(version: Any, attempt: int) -> str:
+    """Cache version of a prompt, distinct for each retry attempt"""
+    return f"{version}" if not attempt else f"{version}-retry{attempt}"
+
+
+def _line_span(node: ast.AST) -> range:
+    """Line numbers of a definition, decorators included"""
+    return range(min([node.lineno] + [decorator.lineno for decorator in node.decorator_list]), node.end_lineno + 1)
+
 
 class TestGenerator:
     """
     A class to generate test cases using Google Gemini API
     """
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, concurrency: int = DEFAULT_CONCURRENCY,
+                 requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND, burst: int = DEFAULT_BURST,
+                 max_retries: int = MAX_RETRIES, cache: Optional[TestCache] = None):
         """
         Initialize the test generator
         
         Args:
             api_key: Google Gemini API key (optional, can also use environment variable)
+            concurrency: Gemini calls in flight at once in generate_tests_batch
+            requests_per_second: Sustained rate of Gemini calls (shared by all batches)
+            burst: Calls that may be sent at once before the rate applies
+            max_retries: Retries of a call that failed with a transient API error
+            cache: Cache of previously generated tests (optional)
         """
         # Use the provided API key or get from environment
         self.api_key = api_key or os.getenv("GEMINI_API_KEY")
+        self.concurrency = max(1, int(concurrency))
+        self.max_retries = max(0, int(max_retries))
+        self.rate_limiter = TokenBucket(requests_per_second, burst)
+        self.cache = cache
         
         # Configure the Gemini API if a key is available
         if self.api_key:
@@ -23,7 +197,8 @@ class TestGenerator:
         else:
             print("Warning: No Gemini API key provided. Test generation will use fallback methods.")
     
-    def generate_test(self, original_code: str, mutated_code: str, mutation_description: str) -> str:
+    def generate_test(self, original_code: str, mutated_code: str, mutation_description: str,
+                      source: Optional[SourceModel] = None, attempt: int = 0) -> str:
         """
         Generate a test case that can detect the mutation
         
@@ -31,58 +206,298 @@ class TestGenerator:
             original_code: The original Python code
             mutated_code: The mutated Python code
             mutation_description: Description of the mutation
-            
+            source: Already-parsed SourceModel of the original code (optional)
+            attempt: How many earlier tests failed to detect the mutation; retries
+                ask for different inputs and are cached separately
+        
         Returns:
             Generated test code as a string
         """
         if not self.api_key:
-            return self._generate_fallback_test(original_code, mutation_description)
+            return self._generate_fallback_test(original_code, mutation_description, source)
+        
+        if attempt:
+            mutation_description += RETRY_NOTE
+        key = cache_key(original_code, mutated_code, MODEL_NAME, _prompt_version(PROMPT_VERSION, attempt)) if self.cache else None
+        if key:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
         
         try:
             # Create a prompt for the API
-            prompt = self._create_prompt(original_code, mutated_code, mutation_description)
+            prompt = self._create_prompt(original_code, mutated_code, mutation_description, source)
             
             # Call the Gemini API
-            model = genai.GenerativeModel('gemini-pro')
-            response = model.generate_content(prompt)
-            
-            # Extract the generated test code
-            test_code = response.text
+            test_code = self._call_api(prompt)
             
             # Clean up the response if it contains markdown code blocks
-            if "```python" in test_code:
-                code_blocks = test_code.split("```")
-                for block in code_blocks:
-                    if block.startswith("python\n"):
-                        test_code = block[7:]  # Remove "python\n"
-                        break
-                    elif not block.strip().startswith(('python', 'markdown')):
-                        test_code = block
-                        break
+            test_code = self._extract_code(test_code)
             
             # If the response doesn't look like a proper test
             if "import unittest" not in test_code and "import pytest" not in test_code:
-                return self._generate_fallback_test(original_code, mutation_description)
+                return self._generate_fallback_test(original_code, mutation_description, source)
             
+            # Only tests written by the model are cached; fallbacks are cheap to rebuild
+            if key:
+                self.cache.put(key, test_code)
             return test_code
-            
+        
         except Exception as e:
             print(f"Error using Google Gemini API: {e}")
             # Fallback to template-based tests
-            return self._generate_fallback_test(original_code, mutation_description)
+            return self._generate_fallback_test(original_code, mutation_description, source)
+    
+    def generate_tests_batch(self, original_code: str, mutants: List[Tuple[str, str]],
+                             source: Optional[SourceModel] = None,
+                             concurrency: Optional[int] = None,
+                             functions: Optional[List[Optional[str]]] = None, attempt: int = 0) -> List[str]:
+        """
+        Generate a test case for each of several mutations concurrently
+        
+        The Gemini calls are issued from a thread pool, at most `concurrency`
+        at a time and no faster than the generator's rate limit; calls that
+        fail with a transient error are retried with exponential backoff.
+        With `functions`, the mutants of one function are batched into a
+        single prompt (up to MAX_BATCH_MUTANTS per call, see
+        generate_function_tests).
+        
+        Args:
+            original_code: The original Python code
+            mutants: (mutated code, mutation description) of each mutation
+            source: Already-parsed SourceModel of the original code (optional)
+            concurrency: Calls in flight at once (defaults to the generator's setting)
+            functions: Function each mutation is in, to batch prompts per function (optional)
+            attempt: How many earlier tests failed to detect the mutations (see generate_test)
+        
+        Returns:
+            Generated test code of each mutation, in the order of the mutants
+        """
+        if not mutants:
+            return []
+        
+        if functions is None or not self.api_key:
+            jobs = [[idx] for idx in range(len(mutants))]
+        else:
+            by_function: Dict[str, List[int]] = {}
+            jobs = []
+            for idx, function in enumerate(functions):
+                if function:
+                    by_function.setdefault(function, []).append(idx)
+                else:
+                    jobs.append([idx])
+            for indices in by_function.values():
+                jobs.extend(indices[start:start + MAX_BATCH_MUTANTS] for start in range(0, len(indices), MAX_BATCH_MUTANTS))
+            jobs.sort()
+        
+        def generate(job):
+            if len(job) == 1:
+                mutated_code, description = mutants[job[0]]
+                return [self.generate_test(original_code, mutated_code, description, source, attempt)]
+            return self.generate_function_tests(original_code, [mutants[idx] for idx in job], functions[job[0]],
+                                                source, attempt)
+        
+        test_codes = [None] * len(mutants)
+        workers = min(len(jobs), max(1, concurrency or self.concurrency))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for job, job_tests in zip(jobs, pool.map(generate, jobs)):
+                for idx, test_code in zip(job, job_tests):
+                    test_codes[idx] = test_code
+        return test_codes
+    
+    def generate_function_tests(self, original_code: str, mutants: List[Tuple[str, str]], function: str,
+                                source: Optional[SourceModel] = None, attempt: int = 0) -> List[str]:
+        """
+        Generate tests for several mutations of one function with a single prompt
+        
+        The prompt lists a compact diff per mutant and asks for one unittest
+        module with a test_mutant_<k> method per mutant; the module is then
+        split into one test module per mutant (see split_test_module).
+        Mutants whose method is missing from the response fall back to
+        generate_test.
+        
+        Args:
+            original_code: The original Python code
+            mutants: (mutated code, mutation description) of each mutation
+            function: Name of the function the mutations are in
+            source: Already-parsed SourceModel of the original code (optional)
+            attempt: How many earlier tests failed to detect the mutations (see generate_test)
+        
+        Returns:
+            Generated test code of each mutation, in the order of the mutants
+        """
+        keys = [
+            cache_key(original_code, mutated_code, MODEL_NAME, _prompt_version(f"batch-{BATCH_PROMPT_VERSION}", attempt))
+            if self.cache else None
+            for mutated_code, _ in mutants
+        ]
+        test_codes = [self.cache.get(key) if key else None for key in keys]
+        pending = [idx for idx, test_code in enumerate(test_codes) if test_code is None]
+        
+        methods = {}
+        if len(pending) > 1 and self.api_key:
+            try:
+                pending_mutants = [
+                    (mutated_code, description + RETRY_NOTE if attempt else description)
+                    for mutated_code, description in (mutants[idx] for idx in pending)
+                ]
+                prompt = self._create_batch_prompt(original_code, pending_mutants, function, source)
+                methods = split_test_module(self._extract_code(self._call_api(prompt)), len(pending))
+            except Exception as e:
+                print(f"Error using Google Gemini API: {e}")
+        
+        for position, idx in enumerate(pending):
+            if position in methods:
+                test_codes[idx] = methods[position]
+                if keys[idx]:
+                    self.cache.put(keys[idx], methods[position])
+            else:
+                mutated_code, description = mutants[idx]
+                test_codes[idx] = self.generate_test(original_code, mutated_code, description, source, attempt)
+        return test_codes
     
-    def _create_prompt(self, original_code: str, mutated_code: str, mutation_description: str) -> str:
+    def _call_api(self, prompt: str) -> str:
+        """
+        Send a prompt to Gemini within the rate limit, retrying transient errors
+        
+        Args:
+            prompt: Prompt string
+        
+        Returns:
+            Text of the response
+        """
+        model = genai.GenerativeModel(MODEL_NAME)
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire()
+            try:
+                return model.generate_content(prompt).text
+            except TRANSIENT_ERRORS as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt) * (1 + random.random())
+                print(f"Gemini API busy ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+    
+    def _extract_code(self, response: str) -> str:
+        """
+        Take the Python code out of a response that may be wrapped in markdown code blocks
+        
+        Args:
+            response: Text of the response
+        
+        Returns:
+            The code of the first code block, or the response itself
+        """
+        if "```python" not in response:
+            return response
+        for block in response.split("```"):
+            if block.startswith("python\n"):
+                return block[7:]  # Remove "python\n"
+            elif block.strip() and not block.strip().startswith(('python', 'markdown')):
+                return block
+        return response
+    
+    def _create_batch_prompt(self, original_code: str, mutants: List[Tuple[str, str]], function: str,
+                             source: Optional[SourceModel] = None) -> str:
+        """
+        Create a prompt asking for one test method per mutant of a function
+        
+        Only the function and the definitions it uses are shown when the
+        code can be sliced (see ContextSlicer).
+        
+        Args:
+            original_code: The original Python code
+            mutants: (mutated code, mutation description) of each mutation
+            function: Name of the function the mutations are in
+            source: Already-parsed SourceModel of the original code (optional)
+        
+        Returns:
+            Prompt string
+        """
+        slicer = self._slicer(original_code, source)
+        context = slicer.slice_function(function) if slicer else None
+        listed = "\n".join(
+            f"Mutant {position}: {description}\n```diff\n{compact_diff(original_code, mutated_code)}```\n"
+            for position, (mutated_code, description) in enumerate(mutants)
+        )
+        return f"""
+You are an expert Python developer and tester. I need tests that detect several bugs introduced by mutations of the function `{function}`.
+
+{CONTEXT_HEADING if context else "Original code:"}
+```python
+{context or original_code}
+```
+
+Each mutant below changes the original code as shown by its diff:
+
+{listed}
+Generate ONE Python unittest module with a single TestCase class holding one test method per mutant.
+The test method for mutant k must be named test_mutant_k (test_mutant_0, test_mutant_1, ...), must pass when
+run against the original code and must fail when run against that mutant.
+
+Please follow these guidelines:
+1. Use the unittest framework
+2. Each test method must be self-contained and only target its own mutant
+3. Make the tests as simple as possible while ensuring they detect the mutations
+4. Don't include any explanations in your response, just the pure Python test code
+5. Include appropriate import statements
+6. Make sure all imports and function calls are correctly qualified
+7. Use relative imports if needed (assume both the code and test are in the same package)
+
+Return ONLY the Python test code without any additional explanations.
+"""
+    
+    def _create_prompt(self, original_code: str, mutated_code: str, mutation_description: str,
+                       source: Optional[SourceModel] = None) -> str:
         """
         Create a prompt for the Gemini API
         
+        When the mutation is inside a function, the prompt holds a slice of
+        the code (the function and the definitions it uses, see
+        ContextSlicer) and a unified diff of the mutation instead of both
+        whole modules, so its size does not grow with the module.
+        
         Args:
             original_code: The original Python code
             mutated_code: The mutated Python code
             mutation_description: Description of the mutation
-            
+            source: Already-parsed SourceModel of the original code (optional)
+        
         Returns:
             Prompt string
         """
+        slicer = self._slicer(original_code, source)
+        context = slicer.slice_mutation(mutated_code) if slicer else None
+        if context:
+            return f"""
+You are an expert Python developer and tester. I need to create a test that can detect a specific bug introduced by a mutation.
+
+{CONTEXT_HEADING}
+```python
+{context}
+```
+
+The mutation (unified diff against the original module):
+```diff
+{compact_diff(original_code, mutated_code, 3)}```
+
+Mutation description: {mutation_description}
+
+Generate a Python test case that will pass when run against the original code but will fail when run against the mutated code. 
+The test should specifically target the mutation described.
+
+Please follow these guidelines:
+1. Use the unittest framework
+2. The test should only focus on testing the specific mutation
+3. Make the test as simple as possible while ensuring it will detect the mutation
+4. Don't include any explanations in your response, just the pure Python test code
+5. Include appropriate import statements
+6. Make sure all imports and function calls are correctly qualified
+7. Use relative imports if needed (assume both the code and test are in the same package)
+
+Return ONLY the Python test code without any additional explanations.
+"""
+        
         return f"""
 You are an expert Python developer and tester. I need to create a test that can detect a specific bug introduced by a mutation.
 
@@ -112,15 +527,24 @@ Please follow these guidelines:
 
 Return ONLY the Python test code without any additional explanations.
 """
-
-    def _generate_fallback_test(self, code: str, mutation_description: str) -> str:
+    
+    def _slicer(self, original_code: str, source: Optional[SourceModel] = None) -> Optional[ContextSlicer]:
+        """Context slicer of the original code, or None if it does not parse"""
+        try:
+            return ContextSlicer(source if source is not None else SourceModel(original_code))
+        except SyntaxError:
+            return None
+    
+    def _generate_fallback_test(self, code: str, mutation_description: str,
+                                source: Optional[SourceModel] = None) -> str:
         """
         Generate a fallback test case when the API is not available
         
         Args:
             code: The original Python code
             mutation_description: Description of the mutation
-            
+            source: Already-parsed SourceModel of the code (optional)
+        
         Returns:
             Generated test code as a string
         """
@@ -129,8 +553,8 @@ Return ONLY the Python test code without any additional explanations.
         import ast
         
         try:
-            # Parse the code to get function/class names
-            tree = ast.parse(code)
+            # Parse the code to get function/class names, reusing the shared parse if we have one
+            tree = source.tree if source is not None else ast.parse(code)
             
             # Find the first function or class definition
             target_name = ""
@@ -156,7 +580,7 @@ Return ONLY the Python test code without any additional explanations.
             else:
                 # If we couldn't find a name, create a generic test
                 return self._create_general_test_template("target_function")
-                
+        
         except SyntaxError:
             # If we couldn't parse the code, create a generic test
             return self._create_general_test_template("target_function")
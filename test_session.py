@@ -0,0 +1,299 @@
+import os
+import sys
+import json
+import time
+import unittest
+import importlib.util
+from typing import Dict, List, Any, Optional
+
+from line_coverage import LineCollector
+from mutant_loader import install_mutant
+
+try:
+    import pytest
+    PYTEST_AVAILABLE = True
+except ImportError:
+    PYTEST_AVAILABLE = False
+
+# Separates the test file name from the test case path in a case id,
+# e.g. "test_0.py::TestDiscount::test_premium_customer"
+CASE_SEPARATOR = "::"
+
+# Case id suffix for a test file that could not be collected
+COLLECTION_CASE = "<collection>"
+
+
+class CaseRecorder:
+    """
+    Write the outcome of every test case of a session as one JSON line
+    
+    The output file is flushed after each case, so the outcomes of the
+    cases that finished are still there when the session is killed on a
+    timeout. With a coverage target, each case also records the target
+    lines it executed; lines executed outside any case (module imports,
+    collection) are recorded as a separate "setup" line.
+    """
+    
+    def __init__(self, output_file: str, coverage_target: Optional[str] = None):
+        """
+        Initialize the recorder
+        
+        Args:
+            output_file: Path of the JSON lines file to write
+            coverage_target: Code file whose executed lines are recorded per case (optional)
+        """
+        self._output = open(output_file, "w", encoding="utf-8")
+        self._collector = LineCollector(coverage_target) if coverage_target else None
+        self._started = None
+        self.all_passed = True
+        if self._collector:
+            self._collector.start()
+    
+    def start_case(self) -> None:
+        if self._collector:
+            self._flush_setup_lines()
+        self._started = time.perf_counter()
+    
+    def finish_case(self, case_id: str, test_file: str, passed: bool, duration: Optional[float] = None) -> None:
+        if self._collector and self._started is None:
+            # Not a started case (a collection error): its lines belong to setup
+            self._flush_setup_lines()
+        if duration is None:
+            duration = time.perf_counter() - self._started if self._started is not None else 0.0
+        record = {"case": case_id, "file": test_file, "passed": passed, "duration": duration}
+        if self._collector:
+            record["lines"] = sorted(self._collector.lines)
+            self._collector.lines.clear()
+        self._write(record)
+        self._started = None
+        self.all_passed = self.all_passed and passed
+    
+    def close(self) -> None:
+        if self._collector:
+            self._collector.stop()
+            self._flush_setup_lines()
+        self._output.close()
+    
+    def _flush_setup_lines(self) -> None:
+        if self._collector.lines:
+            self._write({"setup_lines": sorted(self._collector.lines)})
+            self._collector.lines.clear()
+    
+    def _write(self, record: Dict[str, Any]) -> None:
+        self._output.write(json.dumps(record) + "\n")
+        self._output.flush()
+
+
+class _PytestPlugin:
+    """Report every pytest test case (setup, call and teardown) to a CaseRecorder"""
+    
+    def __init__(self, recorder: CaseRecorder):
+        self.recorder = recorder
+        self._passed: Dict[str, bool] = {}
+        self._durations: Dict[str, float] = {}
+    
+    def pytest_runtest_logstart(self, nodeid, location):
+        self._passed[nodeid] = True
+        self._durations[nodeid] = 0.0
+        self.recorder.start_case()
+    
+    def pytest_runtest_logreport(self, report):
+        self._passed[report.nodeid] = self._passed.get(report.nodeid, True) and not report.failed
+        self._durations[report.nodeid] = self._durations.get(report.nodeid, 0.0) + report.duration
+    
+    def pytest_runtest_logfinish(self, nodeid, location):
+        test_file = nodeid.split(CASE_SEPARATOR, 1)[0]
+        self.recorder.finish_case(nodeid, test_file, self._passed.pop(nodeid, False), self._durations.pop(nodeid, None))
+    
+    def pytest_collectreport(self, report):
+        if report.failed and report.nodeid:
+            test_file = report.nodeid.split(CASE_SEPARATOR, 1)[0]
+            self.recorder.finish_case(f"{test_file}{CASE_SEPARATOR}{COLLECTION_CASE}", test_file, False, 0.0)
+
+
+class _UnittestResult(unittest.TestResult):
+    """Report every unittest test case to a CaseRecorder"""
+    
+    def __init__(self, recorder: CaseRecorder, test_file: str, failfast: bool = False):
+        super().__init__()
+        self.recorder = recorder
+        self.test_file = test_file
+        self.failfast = failfast
+        self._case_passed = True
+    
+    def startTest(self, test):
+        super().startTest(test)
+        self._case_passed = True
+        self.recorder.start_case()
+    
+    def stopTest(self, test):
+        super().stopTest(test)
+        self.recorder.finish_case(case_id(self.test_file, test), self.test_file, self._case_passed)
+    
+    def addError(self, test, err):
+        super().addError(test, err)
+        self._case_passed = False
+    
+    def addFailure(self, test, err):
+        super().addFailure(test, err)
+        self._case_passed = False
+    
+    def addUnexpectedSuccess(self, test):
+        super().addUnexpectedSuccess(test)
+        self._case_passed = False
+    
+    def addSubTest(self, test, subtest, err):
+        super().addSubTest(test, subtest, err)
+        if err is not None:
+            self._case_passed = False
+
+
+def case_id(test_file: str, test: unittest.TestCase) -> str:
+    """
+    Case id of a unittest test case, in the same form pytest uses
+    
+    Args:
+        test_file: File name of the test module
+        test: The test case
+    
+    Returns:
+        Case id such as "test_0.py::TestDiscount::test_premium_customer"
+    """
+    return CASE_SEPARATOR.join([test_file, type(test).__name__, getattr(test, "_testMethodName", str(test))])
+
+
+def case_file(case: str) -> str:
+    """
+    Test file name a case id belongs to
+    
+    Args:
+        case: Case id
+    
+    Returns:
+        The file name part of the id
+    """
+    return case.split(CASE_SEPARATOR, 1)[0]
+
+
+def run_session(config: Dict[str, Any]) -> bool:
+    """
+    Run test files in this process and record each test case's outcome
+    
+    pytest runs the session when it is installed (it also collects unittest
+    test cases); otherwise the files are loaded with unittest.
+    
+    Args:
+        config: Session settings:
+            "test_files": test files to run, all in one directory
+            "output": JSON lines file the case outcomes are written to
+            "cases": case ids to run (optional, defaults to every case)
+            "stop_on_kill": stop at the first failing case (optional)
+            "coverage_target": code file to record executed lines of (optional)
+            "mutant": {"code_file", "source"} (or {"code_file", "compiled"}) to
+                serve in place of the code file (see mutant_loader.install_mutant, optional)
+    
+    Returns:
+        True if every case passed
+    """
+    mutant = config.get("mutant")
+    if mutant:
+        install_mutant(mutant)
+    
+    test_files = config["test_files"]
+    test_dir = os.path.dirname(os.path.abspath(test_files[0]))
+    if test_dir not in sys.path:
+        sys.path.insert(0, test_dir)
+    
+    recorder = CaseRecorder(config["output"], config.get("coverage_target"))
+    try:
+        if PYTEST_AVAILABLE:
+            exit_code = _run_pytest(config, test_dir, recorder)
+            return exit_code == 0 and recorder.all_passed
+        return _run_unittest(config, recorder)
+    finally:
+        recorder.close()
+
+
+def read_session(output_file: str) -> List[Dict[str, Any]]:
+    """
+    Read the records written by run_session
+    
+    Args:
+        output_file: File written by run_session
+    
+    Returns:
+        Records in the order they were written (empty if the file is missing)
+    """
+    records = []
+    try:
+        with open(output_file, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # A session killed mid-write leaves a partial last line
+                    break
+    except OSError:
+        pass
+    return records
+
+
+def _run_pytest(config: Dict[str, Any], test_dir: str, recorder: CaseRecorder) -> int:
+    """Run the session with pytest.main"""
+    targets = config.get("cases") or [os.path.basename(path) for path in config["test_files"]]
+    args = [os.path.join(test_dir, target) for target in targets]
+    # Ignore any configuration file above the session directory
+    args += ["-q", "-c", os.devnull, "--rootdir", test_dir, "-p", "no:cacheprovider",
+             "--continue-on-collection-errors"]
+    if config.get("stop_on_kill"):
+        args.append("-x")
+    return pytest.main(args, plugins=[_PytestPlugin(recorder)])
+
+
+def _run_unittest(config: Dict[str, Any], recorder: CaseRecorder) -> bool:
+    """Run the session with the unittest loader"""
+    selected = set(config["cases"]) if config.get("cases") else None
+    stop_on_kill = bool(config.get("stop_on_kill"))
+    loader = unittest.TestLoader()
+    
+    for path in config["test_files"]:
+        test_file = os.path.basename(path)
+        try:
+            spec = importlib.util.spec_from_file_location(os.path.splitext(test_file)[0], path)
+            module = importlib.util.module_from_spec(spec)
+            sys.modules[spec.name] = module
+            spec.loader.exec_module(module)
+            suite = loader.loadTestsFromModule(module)
+        except BaseException:
+            recorder.finish_case(f"{test_file}{CASE_SEPARATOR}{COLLECTION_CASE}", test_file, False, 0.0)
+            if stop_on_kill:
+                return False
+            continue
+        
+        if selected is not None:
+            suite = unittest.TestSuite(
+                test for test in _iter_cases(suite) if case_id(test_file, test) in selected
+            )
+        result = _UnittestResult(recorder, test_file, failfast=stop_on_kill)
+        suite.run(result)
+        if result.shouldStop:
+            return False
+    
+    return recorder.all_passed
+
+
+def _iter_cases(suite: unittest.TestSuite):
+    """Flatten a test suite into its test cases"""
+    for test in suite:
+        if isinstance(test, unittest.TestSuite):
+            yield from _iter_cases(test)
+        else:
+            yield test
+
+
+if __name__ == "__main__":
+    # Usage: python test_session.py, with the JSON session config on stdin
+    session_config = json.loads(sys.stdin.buffer.read().decode("utf-8"))
+    # Do not let the repository directory shadow modules of the code under test
+    sys.path.pop(0)
+    sys.exit(0 if run_session(session_config) else 1)